@@ -1,5 +1,83 @@
-from .calllimiter import calllimiter
-from .callscheduler import callscheduler
-from .calllogger import calllogger
+import importlib
+import sys
+import types
+import typing
 
-__all__ = ["calllimiter", "callscheduler", "calllogger"]
+# submodules are imported on first access to one of their names (PEP 562),
+# so importing timecontrol only costs what is actually used.
+_exports = {
+    "calllimiter": "calllimiter",
+    "callscheduler": "callscheduler",
+    "calllogger": "calllogger",
+    "compositelimiter": "compositelimiter",
+    "CompositeLimit": "compositelimiter",
+    "callretrier": "callretrier",
+    "RetryBudget": "callretrier",
+    "callbreaker": "callbreaker",
+    "CircuitBreaker": "callbreaker",
+    "CircuitOpenError": "callbreaker",
+    "deadline": "deadline",
+    "DeadlineExceeded": "deadline",
+    "StateFile": "persistence",
+    "REGISTRY": "metrics",
+    "LoopMonitor": "loopmonitor",
+    "LoadFeedback": "loopmonitor",
+}
+
+if typing.TYPE_CHECKING:
+    from .calllimiter import calllimiter
+    from .callscheduler import callscheduler
+    from .calllogger import calllogger
+    from .compositelimiter import compositelimiter, CompositeLimit
+    from .callretrier import callretrier, RetryBudget
+    from .callbreaker import callbreaker, CircuitBreaker, CircuitOpenError
+    from .deadline import deadline, DeadlineExceeded
+    from .persistence import StateFile
+    from .metrics import REGISTRY
+    from .loopmonitor import LoopMonitor, LoadFeedback
+
+
+def __getattr__(name: str):
+    try:
+        module = _exports[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    # cached, next access does not go through here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_exports))
+
+
+class _LazyModule(types.ModuleType):
+    def __setattr__(self, name, value):
+        # importing a submodule binds it on the package : it must not shadow the name exported from it.
+        if name in _exports and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _LazyModule
+
+
+__all__ = [
+    "calllimiter",
+    "callscheduler",
+    "calllogger",
+    "compositelimiter",
+    "CompositeLimit",
+    "callretrier",
+    "RetryBudget",
+    "callbreaker",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "deadline",
+    "DeadlineExceeded",
+    "StateFile",
+    "REGISTRY",
+    "LoopMonitor",
+    "LoadFeedback",
+]
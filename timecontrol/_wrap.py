@@ -0,0 +1,26 @@
+import inspect
+import types
+import typing
+
+SYNC = "sync"
+ASYNC = "async"
+
+
+def callable_kind(fn: typing.Callable) -> typing.Optional[str]:
+    """
+    ASYNC for coroutine functions, SYNC for other functions and methods, None for anything else.
+    Plain functions and methods are checked on their code flags, cheaper than inspect.
+    """
+    t = type(fn)
+    if t is types.MethodType:
+        fn = fn.__func__
+        t = type(fn)
+    if t is types.FunctionType:
+        return ASYNC if fn.__code__.co_flags & inspect.CO_COROUTINE else SYNC
+
+    # then the more general cases
+    if inspect.iscoroutinefunction(fn):
+        return ASYNC
+    if inspect.isfunction(fn) or inspect.ismethod(fn):
+        return SYNC
+    return None
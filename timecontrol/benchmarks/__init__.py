@@ -0,0 +1,4 @@
+"""
+Embedded benchmarks, to measure what time control costs us.
+Run them all with `python -m timecontrol.benchmarks`, results are printed as json.
+"""
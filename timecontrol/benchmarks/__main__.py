@@ -0,0 +1,57 @@
+"""
+Runs all benchmarks, printing results as json on stdout (or in a file), to track regressions over time.
+
+    $ python -m timecontrol.benchmarks --quick --output bench.json
+"""
+
+import argparse
+import contextlib
+import json
+import platform
+import sys
+import time
+
+# import your benchmark modules
+if __package__ is not None:
+    from . import bench_accuracy, bench_jitter, bench_memory, bench_overhead
+else:
+    import bench_accuracy, bench_jitter, bench_memory, bench_overhead
+
+benchmarks = {
+    "overhead": bench_overhead,
+    "accuracy": bench_accuracy,
+    "jitter": bench_jitter,
+    "memory": bench_memory,
+}
+
+parser = argparse.ArgumentParser(prog="python -m timecontrol.benchmarks")
+parser.add_argument(
+    "--quick", action="store_true", help="short runs, for smoke testing"
+)
+parser.add_argument("--output", help="json file to write results to, instead of stdout")
+parser.add_argument(
+    "--only", action="append", choices=sorted(benchmarks), help="benchmark to run"
+)
+args = parser.parse_args()
+
+report = {
+    "timestamp": time.time(),
+    "python": platform.python_version(),
+    "implementation": platform.python_implementation(),
+    "platform": platform.platform(),
+    "quick": args.quick,
+    "results": {},
+}
+
+# anything printed while benchmarking must not corrupt the json output
+with contextlib.redirect_stdout(sys.stderr):
+    for name in args.only or benchmarks:
+        print(f"running {name}...")
+        report["results"][name] = benchmarks[name].run(quick=args.quick)
+
+if args.output:
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+else:
+    json.dump(report, sys.stdout, indent=2)
+    print()
@@ -0,0 +1,56 @@
+"""
+Achieved call rate against target rate, with many concurrent callers.
+"""
+
+import asyncio
+import time
+import typing
+
+from timecontrol.calllimiter import calllimiter
+from timecontrol.compositelimiter import compositelimiter
+
+
+async def achieved(limited, concurrency: int, duration: float) -> typing.Dict:
+    calls = 0
+
+    async def caller():
+        nonlocal calls
+        while True:
+            await limited()
+            calls += 1
+
+    tasks = [asyncio.create_task(caller()) for _ in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.sleep(duration)
+    elapsed = time.perf_counter() - start
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {"calls": calls, "elapsed": elapsed, "rate": calls / elapsed}
+
+
+def run(quick: bool = False) -> typing.Dict[str, typing.Any]:
+    duration = 0.5 if quick else 5.0
+    target = 200.0  # calls per second
+    results = {"target_rate": target, "duration": duration}
+
+    async def noop():
+        pass
+
+    limiters = {
+        "calllimiter": lambda: calllimiter(
+            ratelimit=1 / target, timer=time.perf_counter
+        ),
+        # burst of one, to compare with calllimiter
+        "compositelimiter": lambda: compositelimiter(
+            (1, 1 / target), timer=time.perf_counter
+        ),
+    }
+
+    for concurrency in (1, 10, 100):
+        for name, limiter in limiters.items():
+            res = asyncio.run(achieved(limiter()(noop), concurrency, duration))
+            res["ratio"] = res["rate"] / target
+            results[f"{name}_x{concurrency}"] = res
+
+    return results
@@ -0,0 +1,56 @@
+"""
+Scheduler tick jitter (spread of intervals between ticks) and drift (accumulated lateness) over a long run.
+"""
+
+import asyncio
+import statistics
+import time
+import typing
+
+from timecontrol.callscheduler import callscheduler
+
+
+def summary(ticks: typing.List[float], period: float) -> typing.Dict[str, float]:
+    intervals = [b - a for a, b in zip(ticks, ticks[1:])]
+    return {
+        "ticks": len(ticks),
+        "period": period,
+        "mean_interval": statistics.mean(intervals),
+        "jitter_stdev": statistics.pstdev(intervals),
+        "max_deviation": max(abs(i - period) for i in intervals),
+        # how late is the last tick, compared to a perfect clock started at first tick
+        "drift": (ticks[-1] - ticks[0]) - period * (len(ticks) - 1),
+    }
+
+
+def run(quick: bool = False) -> typing.Dict[str, typing.Any]:
+    period = 0.01
+    count = 50 if quick else 1000
+
+    def tick():
+        return time.perf_counter()
+
+    async def async_tick():
+        return time.perf_counter()
+
+    results = {}
+
+    scheduled = callscheduler(ratelimit=period, timer=time.perf_counter)(tick)
+    ticks = []
+    for t in scheduled():
+        ticks.append(t)
+        if len(ticks) >= count:
+            break
+    results["sync"] = summary(ticks, period)
+
+    async def async_run():
+        scheduled = callscheduler(ratelimit=period, timer=time.perf_counter)(async_tick)
+        ticks = []
+        async for t in scheduled():
+            ticks.append(t)
+            if len(ticks) >= count:
+                break
+        return ticks
+
+    results["async"] = summary(asyncio.run(async_run()), period)
+    return results
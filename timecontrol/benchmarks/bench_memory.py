@@ -0,0 +1,47 @@
+"""
+Memory used per limiter or schedule, when creating many of them.
+"""
+
+import gc
+import time
+import tracemalloc
+import typing
+
+from timecontrol.calllimiter import calllimiter
+from timecontrol.callscheduler import callscheduler
+from timecontrol.compositelimiter import CompositeLimit, compositelimiter
+
+
+def plain():
+    pass
+
+
+def per_instance(factory: typing.Callable[[], typing.Any], count: int) -> float:
+    """bytes allocated per created object, kept alive"""
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    kept = [factory() for _ in range(count)]
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return (end - start) / count
+
+
+def run(quick: bool = False) -> typing.Dict[str, typing.Any]:
+    count = 1_000 if quick else 20_000
+    return {
+        "count": count,
+        "calllimiter_bytes": per_instance(
+            lambda: calllimiter(ratelimit=1)(plain), count
+        ),
+        "compositelimiter_bytes": per_instance(
+            lambda: compositelimiter((10, 1), (600, 60))(plain), count
+        ),
+        "compositelimit_key_bytes": per_instance(
+            lambda: CompositeLimit((10, 1), (600, 60)), count
+        ),
+        "callscheduler_bytes": per_instance(
+            lambda: callscheduler(ratelimit=1, timer=time.monotonic)(plain)(), count
+        ),
+    }
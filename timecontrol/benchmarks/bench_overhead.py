@@ -0,0 +1,120 @@
+"""
+Per-call overhead of decorators, compared to an undecorated baseline.
+Limiters are configured to never sleep, so we only measure their bookkeeping.
+"""
+
+import asyncio
+import subprocess
+import sys
+import time
+import typing
+
+import structlog
+
+from timecontrol.calllimiter import calllimiter
+from timecontrol.calllogger import calllogger
+from timecontrol.callscheduler import callscheduler
+
+
+def plain(x):
+    return x
+
+
+async def async_plain(x):
+    return x
+
+
+def per_call(fn, calls: int) -> float:
+    """nanoseconds per call, best of 3 runs"""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter_ns()
+        for i in range(calls):
+            fn(i)
+        elapsed = (time.perf_counter_ns() - start) / calls
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def async_per_call(coro_fn, calls: int) -> float:
+    """nanoseconds per awaited call, best of 3 runs"""
+
+    async def runner():
+        start = time.perf_counter_ns()
+        for i in range(calls):
+            await coro_fn(i)
+        return (time.perf_counter_ns() - start) / calls
+
+    return min(asyncio.run(runner()) for _ in range(3))
+
+
+def import_ms(module: str) -> float:
+    """milliseconds to import module in a fresh interpreter, best of 3 runs"""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    return 1000 * min(
+        float(
+            subprocess.run(
+                [sys.executable, "-c", code], capture_output=True, text=True, check=True
+            ).stdout
+        )
+        for _ in range(3)
+    )
+
+
+def decorators() -> typing.Dict[str, typing.Callable]:
+    return {
+        "calllimiter_unlimited": calllimiter(ratelimit=None),
+        # a tiny ratelimit : bookkeeping happens, but sleeping never does
+        "calllimiter": calllimiter(ratelimit=1e-12, timer=time.perf_counter),
+        "calllogger": calllogger(),
+        "calllogger_profile": calllogger(profile=True, sample_rate=0.01),
+    }
+
+
+def run(quick: bool = False) -> typing.Dict[str, typing.Any]:
+    calls = 10_000 if quick else 200_000
+
+    # keeping logs out of stdout, and as cheap as possible
+    structlog.configure(logger_factory=structlog.ReturnLoggerFactory())
+
+    results = {"calls": calls, "sync": {}, "async": {}}
+
+    baseline = per_call(plain, calls)
+    results["sync"]["baseline_ns"] = baseline
+    for name, deco in decorators().items():
+        ns = per_call(deco(plain), calls)
+        results["sync"][name] = {"ns": ns, "overhead_ns": ns - baseline}
+
+    async_baseline = async_per_call(async_plain, calls)
+    results["async"]["baseline_ns"] = async_baseline
+    for name, deco in decorators().items():
+        ns = async_per_call(deco(async_plain), calls)
+        results["async"][name] = {"ns": ns, "overhead_ns": ns - async_baseline}
+
+    # decoration cost itself, for large codebases decorating many functions
+    start = time.perf_counter_ns()
+    limiter = calllimiter(ratelimit=1)
+    for _ in range(calls // 10):
+        limiter(plain)
+    results["decoration_ns"] = (time.perf_counter_ns() - start) / (calls // 10)
+    # methods limited per instance still need a generic proxy
+    start = time.perf_counter_ns()
+    limiter = calllimiter(ratelimit=1, binding="instance")
+    for _ in range(calls // 10):
+        limiter(plain)
+    results["decoration_instance_ns"] = (time.perf_counter_ns() - start) / (calls // 10)
+
+    # import cost, paid by every process using us
+    results["import_ms"] = {
+        m: import_ms(m) for m in ("timecontrol", "timecontrol.calllimiter")
+    }
+
+    # scheduler overhead : one tick, without sleeping
+    scheduled = callscheduler(
+        ratelimit=1e-12, timer=time.perf_counter, sleeper=lambda s: None
+    )(plain)
+    results["sync"]["callscheduler_tick_ns"] = per_call(
+        lambda i: next(scheduled(i)), calls // 10
+    )
+
+    return results
@@ -0,0 +1,288 @@
+import asyncio
+import inspect
+import time
+import typing
+from datetime import datetime, timedelta
+
+from timecontrol.calllimiter import TimePeriod, TimePoint
+from timecontrol.compositelimiter import to_seconds
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling, while the circuit is open."""
+
+    def __init__(self, breaker: "CircuitBreaker"):
+        self.breaker = breaker
+        super().__init__(f"circuit is {breaker.state}, failing fast")
+
+
+class Bucket:
+    """Statistics for one slice of the rolling window."""
+
+    __slots__ = ("tick", "calls", "failures", "slow", "bad", "latency")
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, tick):
+        self.tick = tick
+        self.calls = 0
+        self.failures = 0
+        self.slow = 0
+        self.bad = 0  # failed or slow, counted once
+        self.latency = 0.0  # seconds
+
+
+class CircuitBreaker:
+    """
+    Keeps failure and latency statistics over a rolling time window, in a fixed-size ring of buckets.
+    Ref : https://martinfowler.com/bliki/CircuitBreaker.html
+
+    closed -> open : when the failure ratio (slow calls counting as failures) goes over the threshold
+    open -> half_open : after reset_timeout
+    half_open -> closed : when all probes succeeded
+    half_open -> open : as soon as one probe fails
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: TimePeriod = 60,
+        buckets: int = 10,
+        #: ratio of failed calls in the window that opens the circuit
+        failure_ratio: float = 0.5,
+        #: minimum number of calls in the window before considering the ratio
+        min_calls: int = 10,
+        #: calls longer than this are counted as failures
+        slow_call: typing.Optional[TimePeriod] = None,
+        reset_timeout: TimePeriod = 30,
+        #: number of calls let through while half open
+        probes: int = 1,
+        timer: typing.Callable[[], TimePoint] = datetime.now,
+    ):
+        # in seconds, whatever the timer
+        self.window = to_seconds(window)
+        self.width = self.window / buckets
+        self.buckets = [Bucket() for _ in range(buckets)]
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.slow_call = None if slow_call is None else to_seconds(slow_call)
+        self.reset_timeout = to_seconds(reset_timeout)
+        self.probes = probes
+        self.timer = timer
+
+        self._origin = None
+        self._state = CircuitBreaker.CLOSED
+        self._opened = None
+        self._probing = 0
+        self._probed = 0
+
+    def _tick(self, now: TimePoint) -> int:
+        if self._origin is None:
+            self._origin = now
+        return int(to_seconds(now - self._origin) // self.width)
+
+    def _bucket(self, now: TimePoint) -> Bucket:
+        tick = self._tick(now)
+        bucket = self.buckets[tick % len(self.buckets)]
+        if bucket.tick != tick:
+            bucket.reset(tick)  # stale bucket from a previous turn of the ring
+        return bucket
+
+    @property
+    def state(self) -> str:
+        if (
+            self._state == CircuitBreaker.OPEN
+            and to_seconds(self.timer() - self._opened) >= self.reset_timeout
+        ):
+            self._state = CircuitBreaker.HALF_OPEN
+            self._probing = 0
+            self._probed = 0
+        return self._state
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """Aggregated statistics over the current window."""
+        tick = self._tick(self.timer())
+        calls = failures = slow = bad = 0
+        latency = 0.0
+        for b in self.buckets:
+            if b.tick is not None and tick - len(self.buckets) < b.tick <= tick:
+                calls += b.calls
+                failures += b.failures
+                slow += b.slow
+                bad += b.bad
+                latency += b.latency
+        return {
+            "state": self.state,
+            "calls": calls,
+            "failures": failures,
+            "slow": slow,
+            "bad": bad,
+            "mean_latency": latency / calls if calls else 0.0,
+        }
+
+    def allow(self) -> bool:
+        """Whether a call can go through now. Counts a probe when half open."""
+        state = self.state
+        if state == CircuitBreaker.CLOSED:
+            return True
+        if state == CircuitBreaker.HALF_OPEN and self._probing < self.probes:
+            self._probing += 1
+            return True
+        return False
+
+    def release(self):
+        """Gives back a probe, for a call that ended without an outcome (cancelled, or not a failure)."""
+        if self._state == CircuitBreaker.HALF_OPEN and self._probing > self._probed:
+            self._probing -= 1
+
+    def record(self, start: TimePoint, failed: bool):
+        """Records the outcome of a call started at `start`."""
+        now = self.timer()
+        elapsed = to_seconds(now - start)
+        slow = self.slow_call is not None and elapsed >= self.slow_call
+        bucket = self._bucket(now)
+        bucket.calls += 1
+        bucket.latency += elapsed
+        if slow:
+            bucket.slow += 1
+        if failed:
+            bucket.failures += 1
+        if failed or slow:
+            bucket.bad += 1
+
+        if self._state == CircuitBreaker.HALF_OPEN:
+            if failed or slow:
+                self._open(now)
+            else:
+                self._probed += 1
+                if self._probed >= self.probes:
+                    self._close()
+        elif self._state == CircuitBreaker.CLOSED:
+            stats = self.stats()
+            if (
+                stats["calls"] >= self.min_calls
+                and stats["bad"] / stats["calls"] >= self.failure_ratio
+            ):
+                self._open(now)
+
+    def _open(self, now: TimePoint):
+        self._state = CircuitBreaker.OPEN
+        self._opened = now
+
+    def _close(self):
+        self._state = CircuitBreaker.CLOSED
+        for b in self.buckets:
+            b.reset(None)  # starting fresh statistics
+
+
+def callbreaker(
+    window: TimePeriod = 60,
+    buckets: int = 10,
+    failure_ratio: float = 0.5,
+    min_calls: int = 10,
+    slow_call: typing.Optional[TimePeriod] = None,
+    reset_timeout: TimePeriod = 30,
+    probes: int = 1,
+    #: exceptions counted as failures. others are just passed along.
+    failure_on: typing.Tuple[typing.Type[BaseException], ...] = (Exception,),
+    timer: typing.Callable[[], TimePoint] = datetime.now,
+):
+    """
+    Fails fast with CircuitOpenError while upstream is failing, instead of pacing calls into timeouts.
+    The breaker is exposed as `decorator.breaker`, and can be shared by decorating multiple functions.
+    """
+
+    breaker = CircuitBreaker(
+        window=window,
+        buckets=buckets,
+        failure_ratio=failure_ratio,
+        min_calls=min_calls,
+        slow_call=slow_call,
+        reset_timeout=reset_timeout,
+        probes=probes,
+        timer=timer,
+    )
+
+    def decorator(wrapper):
+        import wrapt  # only paid for when decorating
+
+        @wrapt.decorator
+        def callbroken_function(wrapped, instance, args, kwargs):
+            if not breaker.allow():
+                raise CircuitOpenError(breaker)
+            start = timer()
+            try:
+                res = wrapped(*args, **kwargs)
+            except failure_on:
+                breaker.record(start, failed=True)
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record(start, failed=False)
+            return res
+
+        @wrapt.decorator
+        async def async_callbroken_function(wrapped, instance, args, kwargs):
+            if not breaker.allow():
+                raise CircuitOpenError(breaker)
+            start = timer()
+            try:
+                res = await wrapped(*args, **kwargs)
+            except failure_on:
+                breaker.record(start, failed=True)
+                raise
+            except BaseException:
+                # cancelled probes must not keep the circuit half open forever
+                breaker.release()
+                raise
+            breaker.record(start, failed=False)
+            return res
+
+        # checking for async first, to avoid too much if-nesting
+        if inspect.iscoroutinefunction(wrapper):
+            wrap = async_callbroken_function(wrapper)
+
+            # then the more general case
+        elif inspect.isfunction(wrapper) or inspect.ismethod(wrapper):
+            wrap = callbroken_function(wrapper)
+
+            # did we forget any usecase ?
+        else:
+            raise NotImplementedError(f"eventful doesnt support decorating {wrapper}")
+
+        return wrap
+
+    # exposing breaker, for introspection
+    decorator.breaker = breaker
+
+    return decorator
+
+
+if __name__ == "__main__":
+    import random
+
+    breaker = callbreaker(
+        window=timedelta(seconds=2),
+        min_calls=3,
+        reset_timeout=timedelta(seconds=1),
+    )
+
+    @breaker
+    def flaky(*args, **kwargs):
+        time.sleep(0.1)
+        if random.random() < 0.5:
+            raise ConnectionError("upstream unavailable")
+        return kwargs["answer"]
+
+    now = datetime.now()
+    while datetime.now() - now < timedelta(seconds=5):
+        try:
+            print(f"{datetime.now()} : {flaky('the', 'answer', 'is', 42, answer=42)}")
+        except (ConnectionError, CircuitOpenError) as e:
+            print(f"{datetime.now()} : {e!r} {breaker.breaker.stats()}")
+            time.sleep(0.1)
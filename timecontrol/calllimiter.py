@@ -1,5 +1,5 @@
 import asyncio
-import inspect
+import functools
 
 
 # Note the dual concept is still to be determined... (something speeding up scheduler/eventloop somehow...)
@@ -7,13 +7,26 @@ import time
 from datetime import datetime, MINYEAR, timedelta
 
 import typing
-import wrapt
+import weakref
+
+from timecontrol._wrap import ASYNC, callable_kind
+from timecontrol.deadline import DeadlineExceeded, check_deadline, within_deadline
+from timecontrol.loopmonitor import LoadFeedback
+from timecontrol.metrics import REGISTRY, metric_name
+from timecontrol.persistence import encode, decode
 
 
 TimePeriod = typing.Union[timedelta, int]
 TimePoint = typing.Union[datetime, int]  # how about float ? time.time() -> float
 
 
+class _LimiterState:
+    __slots__ = ("last",)
+
+    def __init__(self, last: TimePoint):
+        self.last = last
+
+
 def calllimiter(  # TODO pass log:  = None,  Maybe pass a function / async callable instead ?
     #: https://en.wikipedia.org/wiki/Rate_limiting
     # But this is expressed in time units (minimal guaranteed "no-call" period)
@@ -23,85 +36,173 @@ def calllimiter(  # TODO pass log:  = None,  Maybe pass a function / async calla
     # Not useful here, only for loopaccelerator
     timer: typing.Callable[[], TimePoint] = datetime.now,
     sleeper: typing.Callable[[TimePeriod], None] = None,
+    #: name for metrics. Defaults to the first decorated function, qualified with its module.
+    name: typing.Optional[str] = None,
+    #: backs off (never speeds up) with the event loop load. Only for non-critical work.
+    feedback: typing.Optional[LoadFeedback] = None,
+    #: what shares one limit, for decorated methods :
+    #: "function" (all calls), "instance" (calls on the same object) or "class" (calls on the same class)
+    binding: str = "function",
 ):
+    if binding not in ("function", "instance", "class"):
+        raise ValueError(f"unknown binding {binding}")
 
-    _last = timer()
+    _metrics = None
+
+    _created = timer()
+    _state = _LimiterState(_created)
     # Setting last as now, to prevent accidental bursts on creation.
 
+    _bound: typing.Dict[int, _LimiterState] = {}
+    # one state per instance or class, by identity : equal (or unhashable) objects still get their own.
+    # Entries are removed when their object is collected.
+
+    def state_for(instance) -> _LimiterState:
+        if instance is None:
+            return _state
+        if binding == "class" and not isinstance(instance, type):
+            instance = type(instance)
+        key = id(instance)
+        try:
+            return _bound[key]
+        except KeyError:
+            # Setting last as limiter creation, like the function state.
+            state = _LimiterState(_created)
+            try:
+                weakref.finalize(instance, _bound.pop, key, None)
+            except TypeError as te:
+                raise TypeError(
+                    f"{binding} binding needs weak references to {instance!r}. "
+                    f"Is __weakref__ in its __slots__ ?"
+                ) from te
+            _bound[key] = state
+            return state
+
     _inner_last = datetime(year=MINYEAR, month=1, day=1)
     # Setting last as long time ago, to force speedup on creation.
 
+    def wait_for(state: _LimiterState) -> float:
+        """Seconds to sleep before the next call, 0 if it can happen now."""
+        period = ratelimit
+        if feedback is not None and feedback.factor > 1:
+            # ratelimit is a guaranteed minimum, we can only back off
+            period = ratelimit * feedback.factor
+        # Measure time
+        now = timer()
+
+        # print(f"{now} - {state.last} = {now - state.last}")
+        # sleep if needed (this can be addressed locally)
+        if now - state.last < period:
+            # Call too fast.
+            sleeptime = period - (now - state.last)
+            if isinstance(sleeptime, timedelta):
+                sleeptime = sleeptime.total_seconds()
+            # fail now, rather than sleep for a call nobody waits for anymore
+            try:
+                check_deadline(sleeptime)
+            except DeadlineExceeded:
+                _metrics.rejected.inc()
+                raise
+            return sleeptime
+        return 0
+
+    def limit(state: _LimiterState):
+        if ratelimit:
+            sleeptime = wait_for(state)
+            if sleeptime:
+                # print(f"sleeps for {sleeptime}")
+                # sleeps expected time period - already elapsed time
+                _metrics.waiting.inc()
+                try:
+                    sleeper(sleeptime)
+                finally:
+                    _metrics.waiting.dec()
+            _metrics.wait.observe(sleeptime)
+            state.last = timer()
+        _metrics.admitted.inc()
+
+    async def async_limit(state: _LimiterState):
+        # TODO : we need an asyncio.Lock here. This is meaningless if we get concurrent calls...
+        if ratelimit:
+            sleeptime = wait_for(state)
+            if sleeptime:
+                # print(f"sleeps for {sleeptime}")
+                # sleeps expected time period - already elapsed time
+                _metrics.waiting.inc()
+                try:
+                    await sleeper(sleeptime)
+                finally:
+                    _metrics.waiting.dec()
+            _metrics.wait.observe(sleeptime)
+            state.last = timer()
+        _metrics.admitted.inc()
+
     def decorator(wrapper):
-        nonlocal sleeper
+        nonlocal sleeper, _metrics
 
-        @wrapt.decorator
-        def calllimited_function(wrapped, instance, args, kwargs):
-
-            nonlocal _last
-
-            if ratelimit:
-                # Measure time
-                now = timer()
-
-                # print(f"{now} - {_last} = {now - _last}")
-                # sleep if needed (this can be addressed locally)
-                if now - _last < ratelimit:
-                    # Call too fast.
-                    sleeptime = ratelimit - (now - _last)
-                    if isinstance(sleeptime, timedelta):
-                        sleeptime = sleeptime.total_seconds()
-                    # print(f"sleeps for {sleeptime}")
-                    # sleeps expected time period - already elapsed time
-                    sleeper(sleeptime)
+        # Note : in this decorator generators or classes are not considered...
+        # it throttles only the usual call.
+        kind = callable_kind(wrapper)
+        if kind is None:
+            raise NotImplementedError(f"eventful doesnt support decorating {wrapper}")
 
-                _last = timer()
+        if _metrics is None:
+            _metrics = REGISTRY.limiter(name or metric_name(wrapper))
 
-            return wrapped(*args, **kwargs)
+        if sleeper is None:
+            sleeper = asyncio.sleep if kind == ASYNC else time.sleep
 
-        @wrapt.decorator
-        async def async_calllimited_function(wrapped, instance, args, kwargs):
-
-            nonlocal _last
-            # TODO : we need an asyncio.Lock here. This is meaningless if we get concurrent calls...
-            if ratelimit:
-                # Measure time
-                now = timer()
-
-                # print(f"{now} - {_last} = {now - _last}")
-                # sleep if needed (this can be addressed locally)
-                if now - _last < ratelimit:
-                    # Call too fast.
-                    sleeptime = ratelimit - (now - _last)
-                    if isinstance(sleeptime, timedelta):
-                        sleeptime = sleeptime.total_seconds()
-                    # print(f"sleeps for {sleeptime}")
-                    # sleeps expected time period - already elapsed time
-                    await sleeper(sleeptime)
+        if binding == "function":
+            # fast path : the instance does not matter, no need for a generic proxy.
 
-                _last = timer()
+            if kind == ASYNC:
 
-            return await wrapped(*args, **kwargs)
+                @functools.wraps(wrapper)
+                async def async_calllimited_function(*args, **kwargs):
+                    await async_limit(_state)
+                    # cancelled at the deadline, if any
+                    return await within_deadline(wrapper(*args, **kwargs))
 
-        # Note : in this decorator generators or classes are not considered...
-        # it throttles only the usual call.
+                return async_calllimited_function
 
-        # checking for async first, to avoid too much if-nesting
-        if inspect.iscoroutinefunction(wrapper):
-            if sleeper is None:
-                sleeper = asyncio.sleep
-            wrap = async_calllimited_function(wrapper)
+            @functools.wraps(wrapper)
+            def calllimited_function(*args, **kwargs):
+                limit(_state)
+                return wrapper(*args, **kwargs)
 
-            # then the more general case
-        elif inspect.isfunction(wrapper) or inspect.ismethod(wrapper):
-            if sleeper is None:
-                sleeper = time.sleep
-            wrap = calllimited_function(wrapper)
+            return calllimited_function
 
-            # did we forget any usecase ?
-        else:
-            raise NotImplementedError(f"eventful doesnt support decorating {wrapper}")
+        # wrapt gives us the instance of decorated methods
+        import wrapt
+
+        if kind == ASYNC:
+
+            @wrapt.decorator
+            async def async_calllimited_method(wrapped, instance, args, kwargs):
+                await async_limit(state_for(instance))
+                # cancelled at the deadline, if any
+                return await within_deadline(wrapped(*args, **kwargs))
+
+            return async_calllimited_method(wrapper)
+
+        @wrapt.decorator
+        def calllimited_method(wrapped, instance, args, kwargs):
+            limit(state_for(instance))
+            return wrapped(*args, **kwargs)
+
+        return calllimited_method(wrapper)
+
+    # snapshot and restore, to resume at the right rate after a restart (see persistence.StateFile)
+    # Note : per instance or per class states are not persisted, their keys would not survive a restart.
+    def snapshot():
+        return {"last": encode(_state.last)}
+
+    def restore(state):
+        # a last call in the future (clock skew, monotonic timer from another process) would sleep for it
+        _state.last = min(decode(state["last"]), timer())
 
-        return wrap
+    decorator.snapshot = snapshot
+    decorator.restore = restore
 
     return decorator
 
@@ -1,5 +1,8 @@
 import asyncio
+import functools
 import inspect
+import random
+import tracemalloc
 
 
 # Note the dual concept is still to be determined... (something speeding up scheduler/eventloop somehow...)
@@ -7,15 +10,52 @@ import time
 from datetime import datetime, MINYEAR, timedelta
 
 import typing
-import wrapt
 
+from timecontrol._wrap import ASYNC, callable_kind
 from timecontrol.calllimiter import TimePeriod, TimePoint
+from timecontrol.metrics import REGISTRY, metric_name
+
+
+def calllogger(
+    timer: typing.Callable[[], TimePoint] = datetime.now,
+    #: profiling mode : instead of logging every call, aggregates timings of sampled calls.
+    profile: bool = False,
+    #: fraction of calls to profile
+    sample_rate: float = 1.0,
+    #: also measures net allocations of sampled calls, starting tracemalloc if needed.
+    trace_allocations: bool = False,
+    #: name of the profile. Defaults to the decorated function, qualified with its module.
+    name: typing.Optional[str] = None,
+    random: typing.Callable[[], float] = random.random,
+):
+    """
+    Logs calls to decorated functions.
+    In profiling mode, records wall-clock time, cpu time and allocations for a sample of calls,
+    into per-function streaming aggregates (see metrics.REGISTRY.profiles), cheap enough for production.
+    Note : cpu time of coroutines includes whatever else the loop runs while they await.
+    """
+
+    def measure(prof, start_wall, start_cpu, start_alloc):
+        alloc = 0
+        if start_alloc is not None:
+            alloc = tracemalloc.get_traced_memory()[0] - start_alloc
+        prof.record(
+            time.perf_counter() - start_wall, time.process_time() - start_cpu, alloc
+        )
+
+    def start_alloc():
+        if trace_allocations and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return None
 
-from structlog import get_logger
+    def decorator(wrapper):
+        if profile:
+            return profiler(wrapper)
 
+        # imported on first use, so profiling or just importing timecontrol does not pay for them.
+        import wrapt
+        from structlog import get_logger
 
-def calllogger(timer: typing.Callable[[], TimePoint] = datetime.now,):
-    def decorator(wrapper):
         @wrapt.decorator
         def calllogged_function(wrapped, instance, args, kwargs):
             # TODO : maybe use the log as a trace to enable autodiff ?? cf google's JAX...
@@ -26,6 +66,7 @@ def calllogger(timer: typing.Callable[[], TimePoint] = datetime.now,):
             res = wrapped(*bound_args.args, **bound_args.kwargs)
             log = log.bind(result=res)
             log.info(f"{wrapped.__name__} called: ")
+            return res
 
         @wrapt.decorator
         async def async_calllogged_function(wrapped, instance, args, kwargs):
@@ -39,6 +80,7 @@ def calllogger(timer: typing.Callable[[], TimePoint] = datetime.now,):
             res = await wrapped(*bound_args.args, **bound_args.kwargs)
             log = log.bind(result=res)
             log.info(f"{wrapped.__name__} returned: ")
+            return res
 
         # Note : in this decorator generators or classes are not considered...
         # it throttles only the usual call.
@@ -57,6 +99,47 @@ def calllogger(timer: typing.Callable[[], TimePoint] = datetime.now,):
 
         return wrap
 
+    def profiler(wrapper):
+        kind = callable_kind(wrapper)
+        if kind is None:
+            raise NotImplementedError(f"eventful doesnt support decorating {wrapper}")
+
+        prof = REGISTRY.profile(name or metric_name(wrapper))
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        if kind == ASYNC:
+
+            @functools.wraps(wrapper)
+            async def async_profiled_function(*args, **kwargs):
+                prof.calls += 1
+                if random() >= sample_rate:
+                    return await wrapper(*args, **kwargs)
+                alloc = start_alloc()
+                cpu = time.process_time()
+                wall = time.perf_counter()
+                try:
+                    return await wrapper(*args, **kwargs)
+                finally:
+                    measure(prof, wall, cpu, alloc)
+
+            return async_profiled_function
+
+        @functools.wraps(wrapper)
+        def profiled_function(*args, **kwargs):
+            prof.calls += 1
+            if random() >= sample_rate:
+                return wrapper(*args, **kwargs)
+            alloc = start_alloc()
+            cpu = time.process_time()
+            wall = time.perf_counter()
+            try:
+                return wrapper(*args, **kwargs)
+            finally:
+                measure(prof, wall, cpu, alloc)
+
+        return profiled_function
+
     return decorator
 
 
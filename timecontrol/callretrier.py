@@ -0,0 +1,179 @@
+import asyncio
+import inspect
+import random
+import time
+import typing
+from datetime import datetime, timedelta
+
+from timecontrol.calllimiter import TimePeriod, TimePoint
+from timecontrol.compositelimiter import CompositeLimit, consumed_limits, to_seconds
+from timecontrol.deadline import DeadlineExceeded, exceeds, within_deadline
+
+
+class RetryBudget:
+    """
+    Caps retries as a fraction of calls.
+    Each call deposits `ratio` token, each retry withdraws one.
+    When upstream is down, retries stop quickly instead of multiplying the load.
+    """
+
+    __slots__ = ("ratio", "cap", "tokens")
+
+    def __init__(self, ratio: float = 0.2, cap: float = 10.0):
+        self.ratio = ratio
+        self.cap = cap
+        self.tokens = cap  # allowing a few retries on creation
+
+    def deposit(self):
+        self.tokens = min(self.cap, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def snapshot(self) -> float:
+        return self.tokens
+
+    def restore(self, state: float):
+        self.tokens = min(self.cap, float(state))
+
+
+def callretrier(
+    #: maximum number of retries for one call
+    retries: int = 3,
+    #: base and cap of the backoff, in seconds
+    base: float = 0.1,
+    cap: float = 10.0,
+    #: exceptions that are worth retrying
+    retry_on: typing.Tuple[typing.Type[BaseException], ...] = (Exception,),
+    #: retries allowed, as a fraction of calls
+    budget: typing.Optional[RetryBudget] = None,
+    #: when set, every attempt consumes from this limit, and waits for it along with the backoff.
+    # When the decorated function is already limited by it (see compositelimiter), attempts are
+    # only paced on it, the inner limiter does the consuming.
+    limit: typing.Optional[CompositeLimit] = None,
+    timer: typing.Callable[[], TimePoint] = datetime.now,
+    sleeper: typing.Callable[[TimePeriod], None] = None,
+    jitter: typing.Callable[[float, float], float] = random.uniform,
+):
+    """
+    Retries failed calls, with exponential backoff and decorrelated jitter.
+    Ref : https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+    """
+
+    if budget is None:
+        budget = RetryBudget()
+
+    def backoff(previous: float) -> float:
+        # decorrelated jitter : sleep = min(cap, random_between(base, sleep * 3))
+        return min(cap, jitter(base, previous * 3))
+
+    def pace(wait: float, consume: bool) -> float:
+        """one combined wait for backoff and limit, within the current deadline"""
+        if limit is not None:
+            pending = limit.reserve(timer()) if consume else limit.delay(timer())
+            if pending:
+                wait = max(wait, to_seconds(pending))
+        if exceeds(wait):
+            if limit is not None and consume:
+                limit.release()
+            raise DeadlineExceeded(f"cannot wait {wait}s before the deadline")
+        return wait
+
+    def decorator(wrapper):
+        nonlocal sleeper
+
+        import wrapt  # only paid for when decorating
+
+        # not consuming the limit twice for one attempt
+        consume = not any(l is limit for l in consumed_limits(wrapper))
+
+        @wrapt.decorator
+        def callretried_function(wrapped, instance, args, kwargs):
+            budget.deposit()
+            wait = pace(0, consume)
+            sleep = base
+            attempt = 0
+            while True:
+                if wait:
+                    sleeper(wait)
+                try:
+                    return wrapped(*args, **kwargs)
+                except DeadlineExceeded:
+                    raise  # retrying cannot help, time is up
+                except retry_on as exc:
+                    if attempt >= retries or not budget.withdraw():
+                        raise
+                    attempt += 1
+                    sleep = backoff(sleep)
+                    try:
+                        wait = pace(sleep, consume)
+                    except DeadlineExceeded:
+                        # no time left for a retry, the failure stands
+                        raise exc
+
+        @wrapt.decorator
+        async def async_callretried_function(wrapped, instance, args, kwargs):
+            budget.deposit()
+            wait = pace(0, consume)
+            sleep = base
+            attempt = 0
+            while True:
+                if wait:
+                    await sleeper(wait)
+                try:
+                    return await within_deadline(wrapped(*args, **kwargs))
+                except DeadlineExceeded:
+                    raise  # retrying cannot help, time is up
+                except retry_on as exc:
+                    if attempt >= retries or not budget.withdraw():
+                        raise
+                    attempt += 1
+                    sleep = backoff(sleep)
+                    try:
+                        wait = pace(sleep, consume)
+                    except DeadlineExceeded:
+                        # no time left for a retry, the failure stands
+                        raise exc
+
+        # checking for async first, to avoid too much if-nesting
+        if inspect.iscoroutinefunction(wrapper):
+            if sleeper is None:
+                sleeper = asyncio.sleep
+            wrap = async_callretried_function(wrapper)
+
+            # then the more general case
+        elif inspect.isfunction(wrapper) or inspect.ismethod(wrapper):
+            if sleeper is None:
+                sleeper = time.sleep
+            wrap = callretried_function(wrapper)
+
+            # did we forget any usecase ?
+        else:
+            raise NotImplementedError(f"eventful doesnt support decorating {wrapper}")
+
+        return wrap
+
+    # exposing budget, for introspection
+    decorator.budget = budget
+
+    return decorator
+
+
+if __name__ == "__main__":
+
+    @callretrier(retries=5, base=0.2)
+    def flaky(*args, **kwargs):
+        print(f"{datetime.now()} : {args}, {kwargs}")
+        if random.random() < 0.7:
+            raise ConnectionError("upstream unavailable")
+        return kwargs["answer"]
+
+    now = datetime.now()
+    while datetime.now() - now < timedelta(seconds=5):
+        try:
+            print(flaky("the", "answer", "is", 42, answer=42))
+        except ConnectionError as ce:
+            print(f"gave up: {ce}")
@@ -1,12 +1,16 @@
 import asyncio
 import inspect
+import json
 import time
 import typing
 from datetime import MINYEAR, datetime, timedelta
 
-import wrapt
-
 from timecontrol.calllimiter import TimePeriod, TimePoint
+from timecontrol.compositelimiter import CompositeLimit, to_seconds
+from timecontrol.deadline import DeadlineExceeded, check_deadline, within_deadline
+from timecontrol.loopmonitor import LoadFeedback
+from timecontrol.metrics import REGISTRY, metric_name
+from timecontrol.persistence import encode, decode
 
 
 def callscheduler(  # TODO pass log:  = None,  Maybe pass a function / async callable instead ?
@@ -18,41 +22,149 @@ def callscheduler(  # TODO pass log:  = None,  Maybe pass a function / async cal
     # Not useful here, only for loopaccelerator
     timer: typing.Callable[[], TimePoint] = datetime.now,
     sleeper: typing.Callable[[TimePeriod], None] = None,
+    #: name for metrics. Defaults to the first decorated function, qualified with its module.
+    name: typing.Optional[str] = None,
+    #: scales the period with the event loop load. Only for non-critical work.
+    feedback: typing.Optional[LoadFeedback] = None,
+    #: adaptive polling : compares the previous and the new result, True if the value changed (ie. operator.ne).
+    # The period shortens (down to ratelimit) while the value changes, and grows while it is stable.
+    changed: typing.Optional[typing.Callable[[typing.Any, typing.Any], bool]] = None,
+    #: adaptive polling backs off up to this period. Defaults to 16 * ratelimit.
+    max_period: typing.Optional[TimePeriod] = None,
+    #: adaptive polling factor, to grow or shorten the period with.
+    backoff: float = 2.0,
+    #: a limit shared by many schedulers, consumed by every call.
+    # When it is exhausted, stable schedulers back off rather than wait for it,
+    # leaving the calls to the schedulers whose values are changing.
+    limit: typing.Optional[CompositeLimit] = None,
 ):
 
+    _metrics = None
+
+    if ratelimit and max_period is None:
+        max_period = ratelimit * 16
+
+    _intervals: typing.Dict[typing.Hashable, TimePeriod] = {}
+    # adaptive periods that are not at ratelimit, by call arguments, to snapshot and resume them.
+    # Each scheduled call adapts on its own : poll("x") is not compared with poll("y").
+
+    _unset = object()
+    # no previous result to compare with, yet.
+
     _last = timer() - ratelimit
     # Setting last as now - ratelimit, to allow immediate trigger on creation.
 
     _inner_last = datetime(year=MINYEAR, month=1, day=1)
     # Setting last as long time ago, to force speedup on creation.
 
+    def call_key(args, kwargs) -> typing.Optional[typing.Hashable]:
+        """The arguments of a scheduled call, to remember its adaptive period. None if not hashable."""
+        key = (tuple(args), tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def remember(key, interval):
+        if key is None or changed is None:
+            return
+        if interval == ratelimit:
+            _intervals.pop(key, None)  # the default, no need to keep it
+        else:
+            _intervals[key] = interval
+
+    def current_period(interval):
+        period = ratelimit if changed is None else interval
+        return period if feedback is None else feedback.scale(period)
+
+    def adapt(interval, previous, result):
+        """the next period : shorter when the result changed, longer when it is stable"""
+        if changed is None or previous is _unset:
+            return interval  # nothing to compare with yet
+        if changed(previous, result):
+            return max(ratelimit, interval / backoff)
+        return min(max_period, interval * backoff)
+
+    def spend(interval) -> typing.Tuple[typing.Optional[float], TimePeriod]:
+        """
+        Seconds to wait for the shared limit before calling, None to skip this call.
+        Returns the period to use from now on, along with it.
+        """
+        if limit is None:
+            return 0, interval
+        now = timer()
+        if (
+            changed is not None
+            and ratelimit < interval < max_period
+            and to_seconds(limit.delay(now) or 0) > 0
+        ):
+            # stable and the limit is exhausted : we can wait some more.
+            return None, min(max_period, interval * backoff)
+        try:
+            return limit.acquire(now), interval
+        except DeadlineExceeded:
+            _metrics.rejected.inc()
+            raise
+
     def decorator(wrapper):
-        nonlocal sleeper
+        nonlocal sleeper, _metrics
+
+        import wrapt  # only paid for when decorating
 
         @wrapt.decorator
         def callscheduled_function(wrapped, instance, args, kwargs):
 
             nonlocal _last
 
+            # adaptive polling state, for this scheduled call only
+            key = call_key(args, kwargs)
+            interval = _intervals.get(key, ratelimit)
+            previous = _unset
+
             while ratelimit:  # TODO : find a way to stop/cancel this ?
+                period = current_period(interval)
                 # Measure time
                 now = timer()
 
                 # print(f"{now} - {_last} = {now - _last}")
                 # sleep if needed (this can be addressed locally)
-                sleeptime = ratelimit - (
-                    (now - _last) - ratelimit
-                )  # sleep time should be less than ratelimit
+                sleeptime = period - (
+                    (now - _last) - period
+                )  # sleep time should be less than period
                 if isinstance(sleeptime, timedelta):
                     sleeptime = sleeptime.total_seconds()
 
+                # stops the schedule if next call would be after the deadline
+                try:
+                    check_deadline(sleeptime)
+                except DeadlineExceeded:
+                    _metrics.rejected.inc()
+                    raise
                 print(f"sleeps for {sleeptime}")
                 # sleeps expected time period - already elapsed time
                 sleeper(sleeptime)
+                if sleeptime > 0:
+                    # how late we woke up, compared to what we asked for
+                    _metrics.lateness.observe(
+                        max(0.0, to_seconds(timer() - now) - sleeptime)
+                    )
 
-                if timer() - _last >= ratelimit:
+                if timer() - _last >= period:
                     # Call too slow. calling now
-                    yield wrapped(*args, **kwargs)
+                    wait, interval = spend(interval)
+                    if wait is None:
+                        remember(key, interval)
+                        _last = timer()
+                        continue
+                    if wait:
+                        sleeper(wait)
+                    _metrics.ticks.inc()
+                    result = wrapped(*args, **kwargs)
+                    interval = adapt(interval, previous, result)
+                    previous = result
+                    remember(key, interval)
+                    yield result
                     _last = timer()
 
             # return None mandatory for generators
@@ -61,28 +173,58 @@ def callscheduler(  # TODO pass log:  = None,  Maybe pass a function / async cal
         async def async_calllimited_function(wrapped, instance, args, kwargs):
 
             nonlocal _last
+
+            # adaptive polling state, for this scheduled call only
+            key = call_key(args, kwargs)
+            interval = _intervals.get(key, ratelimit)
+            previous = _unset
+
             # TODO : we need a way to deal with concurrent calls here ... maybe sharing the timers ?
             while ratelimit:
                 # TODO : another possibility is to trampoline here by scheduling a task in the current eventloop...
                 #  It would allow debug and cancelling in the usual ascynio fashion...
+                period = current_period(interval)
                 # Measure time
                 now = timer()
 
                 # print(f"{now} - {_last} = {now - _last}")
                 # sleep if needed (this can be addressed locally)
                 # need to sleep to wait next calltime
-                sleeptime = ratelimit - (
-                    (now - _last) - ratelimit
-                )  # sleep time should be less than ratelimit
+                sleeptime = period - (
+                    (now - _last) - period
+                )  # sleep time should be less than period
                 if isinstance(sleeptime, timedelta):
                     sleeptime = sleeptime.total_seconds()
 
+                # stops the schedule if next call would be after the deadline
+                try:
+                    check_deadline(sleeptime)
+                except DeadlineExceeded:
+                    _metrics.rejected.inc()
+                    raise
                 print(f"sleeps for {sleeptime}")
                 # sleeps expected time period - already elapsed time
                 await sleeper(sleeptime)
-
-                if now - _last >= ratelimit:
-                    yield await wrapped(*args, **kwargs)
+                if sleeptime > 0:
+                    # how late we woke up, compared to what we asked for
+                    _metrics.lateness.observe(
+                        max(0.0, to_seconds(timer() - now) - sleeptime)
+                    )
+
+                if now - _last >= period:
+                    wait, interval = spend(interval)
+                    if wait is None:
+                        remember(key, interval)
+                        _last = timer()
+                        continue
+                    if wait:
+                        await sleeper(wait)
+                    _metrics.ticks.inc()
+                    result = await within_deadline(wrapped(*args, **kwargs))
+                    interval = adapt(interval, previous, result)
+                    previous = result
+                    remember(key, interval)
+                    yield result
                     _last = timer()
 
             # return None mandatory for generators
@@ -90,6 +232,9 @@ def callscheduler(  # TODO pass log:  = None,  Maybe pass a function / async cal
         # Note : in this decorator generators or classes are not considered...
         # it loop-schedule only the usual call.
 
+        if _metrics is None:
+            _metrics = REGISTRY.scheduler(name or metric_name(wrapper))
+
         # checking for async first, to avoid too much if-nesting
         if inspect.iscoroutinefunction(wrapper):
             if sleeper is None:
@@ -108,6 +253,32 @@ def callscheduler(  # TODO pass log:  = None,  Maybe pass a function / async cal
 
         return wrap  # TODO : maybe return a scheduled task (stream ?) instead ??
 
+    # snapshot and restore, to resume at the right rate after a restart (see persistence.StateFile)
+    # adaptive periods are kept, but not the last results : they may not be serializable.
+    def snapshot():
+        intervals = []
+        for k, v in _intervals.items():
+            try:
+                json.dumps(encode(k))
+            except (TypeError, ValueError):
+                continue  # arguments that cannot be saved
+            intervals.append([encode(k), encode(v)])
+        return {"last": encode(_last), "intervals": intervals}
+
+    def restore(state):
+        nonlocal _last
+        # a last call in the future (clock skew, monotonic timer from another process) would sleep for it
+        last = min(decode(state["last"]), timer())
+        intervals = {}
+        for k, v in state.get("intervals", []):
+            intervals[decode(k)] = min(max_period, max(ratelimit, decode(v)))
+        _last = last
+        _intervals.clear()
+        _intervals.update(intervals)
+
+    decorator.snapshot = snapshot
+    decorator.restore = restore
+
     return decorator
 
 
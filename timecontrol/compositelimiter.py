@@ -0,0 +1,332 @@
+import asyncio
+import functools
+import time
+import typing
+from datetime import datetime, timedelta
+
+from timecontrol._wrap import ASYNC, callable_kind
+from timecontrol.calllimiter import TimePeriod, TimePoint
+from timecontrol.deadline import DeadlineExceeded, check_deadline, within_deadline
+from timecontrol.metrics import REGISTRY, metric_name
+from timecontrol.persistence import encode, decode
+
+
+def to_seconds(period: TimePeriod) -> float:
+    """Converts a time period to a number of seconds, usable by sleepers."""
+    if isinstance(period, timedelta):
+        return period.total_seconds()
+    return period
+
+
+class Window:
+    """
+    One quota window, expressed as a number of calls per period.
+    Implemented as a token bucket, full on creation, refilled continuously.
+    Tokens can go negative: a call reserves its slot immediately and sleeps its debt away,
+    so concurrent callers do not need a lock to stay within the quota.
+    """
+
+    __slots__ = ("calls", "period", "tokens", "last")
+
+    def __init__(self, calls: int, period: TimePeriod):
+        if calls <= 0:
+            raise ValueError(f"a window needs a positive number of calls, not {calls}")
+        self.calls = calls
+        # in seconds, so that int and timedelta periods mix, whatever the timer
+        self.period = to_seconds(period)
+        self.tokens = float(calls)
+        self.last = None  # first call will set the refill origin
+
+    def refill(self, now: TimePoint):
+        if self.last is not None:
+            self.tokens = min(
+                float(self.calls),
+                self.tokens + to_seconds(now - self.last) / self.period * self.calls,
+            )
+        self.last = now
+
+    def full(self, now: TimePoint) -> bool:
+        """whether the bucket would be full at now. Does not refill."""
+        if self.last is None:
+            return True
+        elapsed = to_seconds(now - self.last)
+        return self.tokens + elapsed / self.period * self.calls >= self.calls
+
+    def delay(self) -> float:
+        """seconds to wait (since last refill) until one token is available."""
+        if self.tokens >= 1:
+            return 0.0
+        return self.period * ((1 - self.tokens) / self.calls)
+
+    def __repr__(self):
+        return f"Window({self.calls}, {self.period})"
+
+
+class CompositeLimit:
+    """
+    A set of quota windows (10/s AND 600/min AND 100k/day...) checked together.
+    A parent limit is consumed at the same time as this one, so a per-key limit can share a global limit.
+    """
+
+    def __init__(
+        self,
+        *windows: typing.Tuple[int, TimePeriod],
+        parent: typing.Optional["CompositeLimit"] = None,
+    ):
+        self.windows = [Window(calls, period) for calls, period in windows]
+        self.parent = parent
+
+    def chain(self) -> typing.List[Window]:
+        """All windows in this limit and its ancestors."""
+        limit = self
+        windows = []
+        while limit is not None:
+            windows.extend(limit.windows)
+            limit = limit.parent
+        return windows
+
+    def delay(self, now: TimePoint) -> typing.Optional[float]:
+        """The combined seconds to wait for the next call, without consuming anything."""
+        wait = None
+        for w in self.chain():
+            w.refill(now)
+            d = w.delay()
+            if wait is None or d > wait:
+                wait = d
+        return wait
+
+    def reserve(self, now: TimePoint) -> typing.Optional[float]:
+        """
+        Consumes one call from every window in the chain, in one pass.
+        Returns the one combined seconds to wait before doing the call (None if there is no window at all).
+        """
+        wait = self.delay(now)
+        for w in self.chain():
+            w.tokens -= 1
+        return wait
+
+    def full(self, now: TimePoint) -> bool:
+        """Whether this limit's own windows are full : it is then the same as a new one."""
+        return all(w.full(now) for w in self.windows)
+
+    def release(self):
+        """Gives back a reserved call, that will not happen after all."""
+        for w in self.chain():
+            w.tokens += 1
+
+    def acquire(self, now: TimePoint) -> float:
+        """
+        Reserves one call, returning the seconds to wait for it.
+        Raises DeadlineExceeded, without consuming anything, if the wait would overshoot the current deadline.
+        """
+        wait = self.reserve(now) or 0
+        try:
+            check_deadline(wait)
+        except DeadlineExceeded:
+            self.release()
+            raise
+        return wait
+
+    def snapshot(self) -> typing.List:
+        """Token levels of this limit's own windows. A parent limit should be saved on its own."""
+        return [[w.tokens, encode(w.last)] for w in self.windows]
+
+    def restore(self, state: typing.List, now: typing.Optional[TimePoint] = None):
+        """
+        Restores token levels. A refill time later than `now` is not trusted, and moved to now.
+        Raises, without changing anything, if the state does not match the windows.
+        """
+        if len(state) != len(self.windows):
+            raise ValueError(f"{len(state)} window states for {self.windows}")
+        levels = []
+        for tokens, last in state:
+            last = decode(last)
+            if now is not None and last is not None and last > now:
+                last = now
+            levels.append((float(tokens), last))
+        for w, (tokens, last) in zip(self.windows, levels):
+            w.tokens = tokens
+            w.last = last
+
+
+def consumed_limits(fn: typing.Callable) -> typing.List[CompositeLimit]:
+    """The shared limits every call to fn consumes, when fn is decorated with compositelimiter."""
+    return getattr(fn, "_self_compositelimits", [])
+
+
+def compositelimiter(
+    *windows: typing.Tuple[int, TimePeriod],
+    #: a shared limit, consumed by every call, along with the limit for the call.
+    parent: typing.Optional[CompositeLimit] = None,
+    #: maps the call arguments to a key. Each key gets its own limit, sharing the parent.
+    key: typing.Optional[typing.Callable[..., typing.Hashable]] = None,
+    timer: typing.Callable[[], TimePoint] = datetime.now,
+    sleeper: typing.Callable[[TimePeriod], None] = None,
+    #: name for metrics. Defaults to the first decorated function, qualified with its module.
+    name: typing.Optional[str] = None,
+):
+    """
+    Limits calls to respect all windows at once, computing one combined sleep.
+    Stacking multiple calllimiter would sleep sequentially, and wait more than needed.
+
+    >>> global_limit = CompositeLimit((100, 1))
+    >>> @compositelimiter((10, 1), (600, 60), parent=global_limit, key=lambda account, *a, **kw: account)
+    ... def fetch(account, resource): ...
+    """
+
+    _metrics = None
+    _limits: typing.Dict[typing.Hashable, CompositeLimit] = {}
+    _default = CompositeLimit(*windows, parent=parent)
+
+    _prune_at = 64
+    # number of keys triggering the next pruning. Doubles with the live keys, to amortize pruning.
+
+    def prune(now: TimePoint):
+        """Forgets per-key limits that are full again, bounding memory with high-cardinality keys."""
+        nonlocal _prune_at
+        for k in [k for k, l in _limits.items() if l.full(now)]:
+            del _limits[k]
+        _prune_at = max(64, 2 * len(_limits))
+
+    def limit_for(args, kwargs) -> CompositeLimit:
+        if key is None:
+            return _default
+        k = key(*args, **kwargs)
+        try:
+            return _limits[k]
+        except KeyError:
+            if len(_limits) >= _prune_at:
+                prune(timer())
+            _limits[k] = CompositeLimit(*windows, parent=parent)
+            return _limits[k]
+
+    def acquire(args, kwargs) -> float:
+        try:
+            sleeptime = limit_for(args, kwargs).acquire(timer())
+        except DeadlineExceeded:
+            _metrics.rejected.inc()
+            raise
+        _metrics.wait.observe(sleeptime)
+        _metrics.admitted.inc()
+        return sleeptime
+
+    def wait(sleeptime: float):
+        if sleeptime:
+            _metrics.waiting.inc()
+            try:
+                sleeper(sleeptime)
+            finally:
+                _metrics.waiting.dec()
+
+    async def async_wait(sleeptime: float):
+        if sleeptime:
+            _metrics.waiting.inc()
+            try:
+                await sleeper(sleeptime)
+            finally:
+                _metrics.waiting.dec()
+
+    def limited(wrapper):
+        nonlocal sleeper, _metrics
+
+        kind = callable_kind(wrapper)
+        if kind is None:
+            raise NotImplementedError(f"eventful doesnt support decorating {wrapper}")
+
+        if _metrics is None:
+            _metrics = REGISTRY.limiter(name or metric_name(wrapper))
+
+        if sleeper is None:
+            sleeper = asyncio.sleep if kind == ASYNC else time.sleep
+
+        if key is None:
+            # fast path : arguments do not matter, no need for a generic proxy.
+
+            if kind == ASYNC:
+
+                @functools.wraps(wrapper)
+                async def async_compositelimited_function(*args, **kwargs):
+                    # reserving before sleeping means concurrent calls will queue up properly
+                    await async_wait(acquire(args, kwargs))
+                    # cancelled at the deadline, if any
+                    return await within_deadline(wrapper(*args, **kwargs))
+
+                return async_compositelimited_function
+
+            @functools.wraps(wrapper)
+            def compositelimited_function(*args, **kwargs):
+                wait(acquire(args, kwargs))
+                return wrapper(*args, **kwargs)
+
+            return compositelimited_function
+
+        # wrapt strips the instance from the arguments passed to key
+        import wrapt
+
+        if kind == ASYNC:
+
+            @wrapt.decorator
+            async def async_compositelimited_method(wrapped, instance, args, kwargs):
+                await async_wait(acquire(args, kwargs))
+                return await within_deadline(wrapped(*args, **kwargs))
+
+            return async_compositelimited_method(wrapper)
+
+        @wrapt.decorator
+        def compositelimited_method(wrapped, instance, args, kwargs):
+            wait(acquire(args, kwargs))
+            return wrapped(*args, **kwargs)
+
+        return compositelimited_method(wrapper)
+
+    # the limits consumed by every call, that other callers may share
+    _shared = []
+    limit = _default if key is None else parent
+    while limit is not None:
+        _shared.append(limit)
+        limit = limit.parent
+
+    def decorator(wrapper):
+        wrap = limited(wrapper)
+        # `_self_` prefix : wrapt keeps it on the proxy, instead of setting it on the decorated function.
+        wrap._self_compositelimits = _shared
+        return wrap
+
+    # exposing limits, for introspection.
+    # `limit` is the one limit every call consumes : with a key, that is the shared parent (if any).
+    decorator.limit = _default if key is None else parent
+    decorator.limits = _limits
+
+    # snapshot and restore, to resume at the right rate after a restart (see persistence.StateFile)
+    def snapshot():
+        prune(timer())
+        return {
+            "limit": _default.snapshot(),
+            "keys": [[encode(k), l.snapshot()] for k, l in _limits.items()],
+        }
+
+    def restore(state):
+        now = timer()
+        # restoring into new limits first : nothing changes if one of them does not fit
+        restored = {}
+        for k, s in state["keys"]:
+            restored[decode(k)] = CompositeLimit(*windows, parent=parent)
+            restored[decode(k)].restore(s, now)
+        _default.restore(state["limit"], now)
+        _limits.update(restored)
+
+    decorator.snapshot = snapshot
+    decorator.restore = restore
+
+    return decorator
+
+
+if __name__ == "__main__":
+
+    @compositelimiter((2, 1), (5, 10), timer=time.time)
+    def printer(*args, **kwargs):
+        print(f"{datetime.now()} : {args}, {kwargs}")
+
+    now = datetime.now()
+    while datetime.now() - now < timedelta(seconds=12):
+        printer("the", "answer", "is", 42, answer=42)
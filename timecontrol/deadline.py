@@ -0,0 +1,106 @@
+import asyncio
+import contextlib
+import contextvars
+import time
+import typing
+from datetime import datetime, timedelta
+
+# Note : limiters depend on this module, so we cannot import their types here.
+TimePeriod = typing.Union[timedelta, int, float]
+TimePoint = typing.Any
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call cannot complete before the current deadline."""
+
+
+#: the current deadline, as a time point and the timer it is measured with.
+_deadline = contextvars.ContextVar("timecontrol_deadline", default=None)
+
+
+def _seconds(period: TimePeriod) -> float:
+    if isinstance(period, timedelta):
+        return period.total_seconds()
+    return period
+
+
+def _after(now: TimePoint, timeout: TimePeriod) -> TimePoint:
+    """The time point timeout after now, for numeric and datetime timers alike."""
+    if isinstance(now, datetime):
+        return now + (
+            timeout if isinstance(timeout, timedelta) else timedelta(seconds=timeout)
+        )
+    return now + _seconds(timeout)
+
+
+def remaining() -> typing.Optional[float]:
+    """Seconds left before the current deadline, or None if there is no deadline."""
+    current = _deadline.get()
+    if current is None:
+        return None
+    point, timer = current
+    return _seconds(point - timer())
+
+
+@contextlib.contextmanager
+def deadline(
+    timeout: TimePeriod, timer: typing.Callable[[], TimePoint] = time.monotonic
+):
+    """
+    Sets a deadline for all time controlled calls in this context (task, thread...).
+    Nested deadlines can only shorten the outer one, never extend it.
+
+    >>> with deadline(2.5):
+    ...     limited_call()  # raises DeadlineExceeded if it would sleep past the deadline
+    """
+    left = remaining()
+    if left is not None and left <= _seconds(timeout):
+        yield  # outer deadline comes first
+        return
+
+    token = _deadline.set((_after(timer(), timeout), timer))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def exceeds(wait: float) -> bool:
+    """Whether waiting for `wait` seconds would overshoot the current deadline."""
+    left = remaining()
+    return left is not None and wait > left
+
+
+def check_deadline(wait: float = 0):
+    """Raises DeadlineExceeded if we cannot wait `wait` seconds before the deadline."""
+    if exceeds(wait):
+        raise DeadlineExceeded(f"cannot wait {wait}s, deadline is in {remaining()}s")
+
+
+async def within_deadline(awaitable: typing.Awaitable):
+    """Awaits, cancelling at the deadline if there is one."""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()  # avoids never-awaited warning
+        raise DeadlineExceeded("deadline already passed")
+    # not asyncio.wait_for : a TimeoutError raised by the callee itself must not pass for the deadline.
+    task = asyncio.ensure_future(awaitable)
+    expired = False
+
+    def expire():
+        nonlocal expired
+        expired = True
+        task.cancel()
+
+    handle = asyncio.get_running_loop().call_later(left, expire)
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if expired:
+            raise DeadlineExceeded(f"cancelled at deadline, after {left}s") from None
+        raise
+    finally:
+        handle.cancel()
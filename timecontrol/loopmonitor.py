@@ -0,0 +1,182 @@
+"""
+Measures event loop responsiveness, so that time control can adapt to the load.
+This is the measure part of the "loopaccelerator" idea : limiters and schedulers subscribe to it,
+backing off non-critical work when the loop is overloaded, and speeding it up when it is idle.
+"""
+
+import asyncio
+import collections
+import time
+import typing
+
+
+def origin(handle: asyncio.Handle) -> str:
+    """Where a callback comes from : the coroutine for task steps, the callable otherwise."""
+    callback = handle._callback
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        code = getattr(task.get_coro(), "cr_code", None)
+        if code is not None:
+            return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+class LoopMonitor:
+    """
+    Samples event loop lag : how late a sleep of `interval` wakes up.
+    Optionally times every callback run by the loop, to report slow ones with their origin.
+
+    >>> monitor = LoopMonitor()
+    >>> monitor.start()  # in a running loop
+    >>> monitor.mean_lag, monitor.slow_callbacks
+    """
+
+    def __init__(
+        self,
+        #: seconds between two lag samples
+        interval: float = 0.05,
+        #: callbacks longer than this many seconds are reported
+        slow_callback: float = 0.1,
+        #: times every callback. Costs two timer calls per callback.
+        track_callbacks: bool = False,
+        #: number of slow callbacks kept
+        history: int = 32,
+        #: weight of the last sample in the mean lag
+        smoothing: float = 0.2,
+        timer: typing.Callable[[], float] = time.perf_counter,
+        sleeper=asyncio.sleep,
+    ):
+        self.interval = interval
+        self.slow_callback = slow_callback
+        self.track_callbacks = track_callbacks
+        self.smoothing = smoothing
+        self.timer = timer
+        self.sleeper = sleeper
+
+        self.samples = 0
+        self.lag = 0.0
+        self.mean_lag = 0.0
+        self.max_lag = 0.0
+        self.slow_callbacks: typing.Deque[typing.Tuple[str, float]] = collections.deque(
+            maxlen=history
+        )
+
+        self._subscribers: typing.List[typing.Callable[["LoopMonitor"], None]] = []
+        self._task: typing.Optional[asyncio.Task] = None
+        self._tracking = False
+
+    def subscribe(self, callback: typing.Callable[["LoopMonitor"], None]):
+        """callback will be called with this monitor, after each sample."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: typing.Callable[["LoopMonitor"], None]):
+        self._subscribers.remove(callback)
+
+    def sample(self, lag: float):
+        self.samples += 1
+        self.lag = lag
+        self.mean_lag += self.smoothing * (lag - self.mean_lag)
+        self.max_lag = max(self.max_lag, lag)
+        for s in self._subscribers:
+            s(self)
+
+    async def run(self):
+        while True:
+            start = self.timer()
+            await self.sleeper(self.interval)
+            self.sample(max(0.0, self.timer() - start - self.interval))
+
+    def start(self) -> asyncio.Task:
+        """Starts monitoring the running loop."""
+        if self.track_callbacks:
+            self._patch()
+        self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._unpatch()
+
+    def _patch(self):
+        if self._tracking:
+            return
+        self._tracking = True
+        if not _tracking:
+            _install()
+        _tracking.append(self)
+
+    def _unpatch(self):
+        if not self._tracking:
+            return
+        self._tracking = False
+        _tracking.remove(self)
+        if not _tracking:
+            _uninstall()
+
+
+#: monitors timing callbacks. They share one hook, as asyncio.Handle._run is process-wide.
+_tracking: typing.List[LoopMonitor] = []
+_handle_run = None
+
+
+def _run(handle):
+    monitors = tuple(_tracking)
+    starts = [m.timer() for m in monitors]
+    _handle_run(handle)
+    for monitor, start in zip(monitors, starts):
+        duration = monitor.timer() - start
+        if duration >= monitor.slow_callback:
+            monitor.slow_callbacks.append((origin(handle), duration))
+
+
+def _install():
+    # Note : this only sees loops using asyncio's python Handle (not uvloop)
+    global _handle_run
+    _handle_run = asyncio.Handle._run
+    asyncio.Handle._run = _run
+
+
+def _uninstall():
+    global _handle_run
+    asyncio.Handle._run = _handle_run
+    _handle_run = None
+
+
+class LoadFeedback:
+    """
+    Turns loop lag into a factor to scale periods of non-critical work with.
+    The factor doubles (up to max_factor) while the loop is overloaded,
+    and halves (down to min_factor) while it is idle.
+    Latency-critical work should simply not use it.
+    """
+
+    def __init__(
+        self,
+        monitor: LoopMonitor,
+        #: mean lag (seconds) over which the loop is overloaded
+        overloaded: float = 0.05,
+        #: mean lag (seconds) under which the loop is idle
+        idle: float = 0.005,
+        #: under 1.0, work is sped up when idle
+        min_factor: float = 1.0,
+        max_factor: float = 8.0,
+        step: float = 2.0,
+    ):
+        self.overloaded = overloaded
+        self.idle = idle
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.step = step
+        self.factor = 1.0
+        monitor.subscribe(self.update)
+
+    def update(self, monitor: LoopMonitor):
+        if monitor.mean_lag > self.overloaded:
+            self.factor = min(self.max_factor, self.factor * self.step)
+        elif monitor.mean_lag < self.idle:
+            self.factor = max(self.min_factor, self.factor / self.step)
+
+    def scale(self, period):
+        return period * self.factor
@@ -0,0 +1,271 @@
+"""
+Instrumentation for limiters, schedulers and profiled calls.
+Updates are plain attribute increments : no lock, no allocation, negligible when nobody reads them.
+Read them with REGISTRY.collect(), or expose them to prometheus with REGISTRY.serve().
+"""
+
+import asyncio
+import bisect
+import math
+import typing
+
+#: default histogram buckets, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class Histogram:
+    """Fixed buckets histogram. Counts are per bucket, not cumulative (the exporter accumulates)."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: typing.Sequence[float] = BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def collect(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "buckets": dict(zip(self.bounds + (float("inf"),), self.counts)),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+class QuantileSketch:
+    """
+    Streaming quantiles with bounded relative error, in bounded memory (log-spaced buckets).
+    Ref : https://arxiv.org/abs/1908.10693 (DDSketch)
+    """
+
+    __slots__ = ("gamma", "log_gamma", "max_buckets", "buckets", "zeros", "count")
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets: typing.Dict[int, int] = {}
+        self.zeros = 0  # values too small for a log bucket
+        self.count = 0
+
+    def observe(self, value: float):
+        self.count += 1
+        if value <= 1e-12:
+            self.zeros += 1
+            return
+        i = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            # collapsing the two lowest buckets : only low quantiles lose accuracy
+            low, nxt = sorted(self.buckets)[:2]
+            self.buckets[nxt] += self.buckets.pop(low)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if rank < seen:
+                return 2 * self.gamma**i / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class Profile:
+    """Streaming aggregates of sampled calls to one function."""
+
+    __slots__ = ("calls", "sampled", "wall", "cpu", "wall_sum", "cpu_sum", "alloc_sum")
+
+    def __init__(self):
+        self.calls = 0  # all calls, sampled or not
+        self.sampled = 0
+        self.wall = QuantileSketch()
+        self.cpu = QuantileSketch()
+        self.wall_sum = 0.0
+        self.cpu_sum = 0.0
+        self.alloc_sum = 0  # net bytes allocated, when tracing allocations
+
+    def record(self, wall: float, cpu: float, alloc: int = 0):
+        self.sampled += 1
+        self.wall.observe(wall)
+        self.cpu.observe(cpu)
+        self.wall_sum += wall
+        self.cpu_sum += cpu
+        self.alloc_sum += alloc
+
+    def collect(self) -> typing.Dict[str, typing.Any]:
+        n = self.sampled or 1
+        return {
+            "calls": self.calls,
+            "sampled": self.sampled,
+            "wall_mean": self.wall_sum / n,
+            "cpu_mean": self.cpu_sum / n,
+            "alloc_mean": self.alloc_sum / n,
+            "wall_quantiles": {q: self.wall.quantile(q) for q in (0.5, 0.9, 0.99)},
+            "cpu_quantiles": {q: self.cpu.quantile(q) for q in (0.5, 0.9, 0.99)},
+        }
+
+
+class LimiterMetrics:
+    __slots__ = ("admitted", "rejected", "waiting", "wait")
+
+    def __init__(self):
+        self.admitted = Counter()  # calls let through
+        self.rejected = Counter()  # calls failed before waiting (deadline)
+        self.waiting = Gauge()  # calls currently sleeping in the limiter
+        self.wait = Histogram()  # seconds slept per call. sum is the total wait time.
+
+    def collect(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "admitted": self.admitted.value,
+            "rejected": self.rejected.value,
+            "waiting": self.waiting.value,
+            "wait": self.wait.collect(),
+        }
+
+
+class SchedulerMetrics:
+    __slots__ = ("ticks", "rejected", "lateness")
+
+    def __init__(self):
+        self.ticks = Counter()  # scheduled calls done
+        self.rejected = Counter()  # schedules stopped by a deadline
+        self.lateness = Histogram()  # seconds between expected and actual wake up
+
+    def collect(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "ticks": self.ticks.value,
+            "rejected": self.rejected.value,
+            "lateness": self.lateness.collect(),
+        }
+
+
+class Registry:
+    def __init__(self):
+        self.limiters: typing.Dict[str, LimiterMetrics] = {}
+        self.schedulers: typing.Dict[str, SchedulerMetrics] = {}
+        self.profiles: typing.Dict[str, Profile] = {}
+
+    def limiter(self, name: str) -> LimiterMetrics:
+        """Metrics for the limiter with this name. Limiters with the same name share their metrics."""
+        return self.limiters.setdefault(name, LimiterMetrics())
+
+    def scheduler(self, name: str) -> SchedulerMetrics:
+        return self.schedulers.setdefault(name, SchedulerMetrics())
+
+    def profile(self, name: str) -> Profile:
+        return self.profiles.setdefault(name, Profile())
+
+    def collect(self) -> typing.Dict[str, typing.Any]:
+        """Pull API : a snapshot of all metrics, as plain python data."""
+        return {
+            "limiters": {n: m.collect() for n, m in self.limiters.items()},
+            "schedulers": {n: m.collect() for n, m in self.schedulers.items()},
+            "profiles": {n: p.collect() for n, p in self.profiles.items()},
+        }
+
+    def prometheus(self) -> str:
+        """All metrics, in prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, label, metrics, get):
+            lines.append(f"# TYPE timecontrol_{name} {kind}")
+            for n, m in metrics.items():
+                value = get(m)
+                labels = f'{label}="{_escape(n)}"'
+                if kind == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(
+                        value.bounds + (float("inf"),), value.counts
+                    ):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(
+                            f'timecontrol_{name}_bucket{{{labels},le="{le}"}} {cumulative}'
+                        )
+                    lines.append(f"timecontrol_{name}_sum{{{labels}}} {value.sum}")
+                    lines.append(f"timecontrol_{name}_count{{{labels}}} {value.count}")
+                else:
+                    lines.append(f"timecontrol_{name}{{{labels}}} {value.value}")
+
+        for name, kind, get in (
+            ("limiter_admitted_total", "counter", lambda m: m.admitted),
+            ("limiter_rejected_total", "counter", lambda m: m.rejected),
+            ("limiter_waiting", "gauge", lambda m: m.waiting),
+            ("limiter_wait_seconds", "histogram", lambda m: m.wait),
+        ):
+            family(name, kind, "limiter", self.limiters, get)
+        for name, kind, get in (
+            ("scheduler_ticks_total", "counter", lambda m: m.ticks),
+            ("scheduler_rejected_total", "counter", lambda m: m.rejected),
+            ("scheduler_lateness_seconds", "histogram", lambda m: m.lateness),
+        ):
+            family(name, kind, "scheduler", self.schedulers, get)
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9464):
+        """
+        Serves prometheus text over http on a local socket, until the returned server is closed.
+        Only reads metrics when scraped.
+        """
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            # ignoring the request, there is only one page here
+            try:
+                await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                pass
+            body = self.prometheus().encode()
+            writer.write(
+                b"HTTP/1.0 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+            )
+            await writer.drain()
+            writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+
+def metric_name(fn: typing.Callable) -> str:
+    """Default name for the metrics of a decorated function, unique across modules."""
+    return f"{fn.__module__}.{fn.__qualname__}"
+
+
+def _escape(label: str) -> str:
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+#: default registry, used by all limiters and schedulers
+REGISTRY = Registry()
@@ -0,0 +1,142 @@
+"""
+Snapshot and restore of limiter state, to resume at the right rate after a restart.
+Time points are stored as is : only limiters with a wall-clock timer (datetime.now, time.time)
+can be meaningfully restored in another process. A monotonic timer restarts from an arbitrary point.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+import typing
+from datetime import datetime, timedelta
+
+
+class Stateful(typing.Protocol):
+    def snapshot(self) -> typing.Any: ...
+
+    def restore(self, state: typing.Any) -> None: ...
+
+
+def encode(value: typing.Any) -> typing.Any:
+    """Encodes time values (and tuples, usable as keys) into json-compatible values."""
+    if isinstance(value, datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {"timedelta": value.total_seconds()}
+    if isinstance(value, tuple):
+        return {"tuple": [encode(v) for v in value]}
+    return value
+
+
+def decode(value: typing.Any) -> typing.Any:
+    """Reverse of encode."""
+    if isinstance(value, dict):
+        if "datetime" in value:
+            return datetime.fromisoformat(value["datetime"])
+        if "timedelta" in value:
+            return timedelta(seconds=value["timedelta"])
+        if "tuple" in value:
+            return tuple(decode(v) for v in value["tuple"])
+    return value
+
+
+class StateFile:
+    """
+    A compact local json file, holding snapshots of registered limiters.
+    Writes are atomic : a crash while saving leaves the previous snapshot in place.
+
+    >>> state = StateFile("limiters.json")
+    >>> limiter = state.register("upstream", calllimiter(ratelimit=1, timer=time.time))
+    >>> state.load()  # on startup
+    >>> asyncio.create_task(state.autosave())  # periodically
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        path: typing.Union[str, os.PathLike],
+        #: seconds between two periodic saves
+        interval: float = 10.0,
+        timer: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.path = os.fspath(path)
+        self.interval = interval
+        self.timer = timer
+        self._registered: typing.Dict[str, Stateful] = {}
+        self._saved = None
+
+    def register(self, name: str, stateful: Stateful) -> Stateful:
+        """Registers something to snapshot under this name. Returns it, for convenience."""
+        self._registered[name] = stateful
+        return stateful
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        return {name: s.snapshot() for name, s in self._registered.items()}
+
+    def save(self):
+        """Writes all snapshots to a temporary file, then atomically replaces the state file."""
+        data = json.dumps(
+            {"version": StateFile.VERSION, "states": self.snapshot()},
+            separators=(",", ":"),
+        )
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(
+            dir=directory, prefix=os.path.basename(self.path), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._saved = self.timer()
+
+    def load(self) -> bool:
+        """
+        Restores registered limiters from the state file.
+        Returns False, and leaves limiters untouched, if there is no usable file,
+        or if one of the states does not fit its limiter anymore (timer or windows changed...).
+        """
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != StateFile.VERSION:
+            return False
+        states = data.get("states", {})
+        # all or nothing : previous states are put back if one restore fails
+        previous = {}
+        try:
+            for name, s in self._registered.items():
+                if name in states:
+                    before = s.snapshot()
+                    s.restore(states[name])
+                    previous[name] = before
+        except Exception:
+            for name, before in previous.items():
+                self._registered[name].restore(before)
+            return False
+        return True
+
+    def maybe_save(self) -> bool:
+        """Saves if the last save is older than interval. Cheap enough to call from a loop."""
+        if self._saved is None or self.timer() - self._saved >= self.interval:
+            self.save()
+            return True
+        return False
+
+    async def autosave(self, sleeper=asyncio.sleep):
+        """Saves every interval, until cancelled. Saves one last time on cancellation."""
+        try:
+            while True:
+                await sleeper(self.interval)
+                self.save()
+        finally:
+            self.save()
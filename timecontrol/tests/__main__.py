@@ -8,9 +8,31 @@ uses integrated python tools only.
 
 # import your test modules
 if __package__ is not None:
-    from . import test_calllimiter, test_callscheduler
+    from . import (
+        test_calllimiter,
+        test_callscheduler,
+        test_compositelimiter,
+        test_callretrier,
+        test_callbreaker,
+        test_deadline,
+        test_persistence,
+        test_metrics,
+        test_loopmonitor,
+        test_calllogger,
+        test_binding,
+        test_lazy,
+        test_adaptive,
+    )
 else:
-    import test_calllimiter, test_callscheduler
+    import test_calllimiter, test_callscheduler, test_compositelimiter
+    import test_callretrier, test_callbreaker, test_deadline
+    import test_persistence
+    import test_metrics
+    import test_loopmonitor
+    import test_calllogger
+    import test_binding
+    import test_lazy
+    import test_adaptive
 
 # initialize the test suite
 loader = unittest.TestLoader()
@@ -19,6 +41,17 @@ suite = unittest.TestSuite()
 # add tests to the test suite
 suite.addTests(loader.loadTestsFromModule(test_calllimiter))
 suite.addTests(loader.loadTestsFromModule(test_callscheduler))
+suite.addTests(loader.loadTestsFromModule(test_compositelimiter))
+suite.addTests(loader.loadTestsFromModule(test_callretrier))
+suite.addTests(loader.loadTestsFromModule(test_callbreaker))
+suite.addTests(loader.loadTestsFromModule(test_deadline))
+suite.addTests(loader.loadTestsFromModule(test_persistence))
+suite.addTests(loader.loadTestsFromModule(test_metrics))
+suite.addTests(loader.loadTestsFromModule(test_loopmonitor))
+suite.addTests(loader.loadTestsFromModule(test_calllogger))
+suite.addTests(loader.loadTestsFromModule(test_binding))
+suite.addTests(loader.loadTestsFromModule(test_lazy))
+suite.addTests(loader.loadTestsFromModule(test_adaptive))
 
 # initialize a runner, pass it your suite and run it
 runner = unittest.TextTestRunner(verbosity=3)
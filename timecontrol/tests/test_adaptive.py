@@ -0,0 +1,147 @@
+import operator
+import unittest
+
+from ..callscheduler import callscheduler
+from ..compositelimiter import CompositeLimit
+
+
+class TestAdaptivePolling(unittest.TestCase):
+    def timer(self):
+        return self.clock
+
+    def sleepcounter(self, to_sleep):
+        self.slept.append(to_sleep)
+        self.clock += max(0, to_sleep)
+
+    def poll(self):
+        self.calls.append(self.clock)
+        return self.results.pop(0)
+
+    def setUp(self) -> None:
+        self.clock = 0
+        self.slept = []
+        self.calls = []
+
+    def gaps(self):
+        return [b - a for a, b in zip(self.calls, self.calls[1:])]
+
+    def test_backoff_and_speedup(self):
+        self.results = [1, 1, 1, 1, 1, 2, 3, 4]
+        scheduler = callscheduler(
+            ratelimit=1,
+            max_period=4,
+            changed=operator.ne,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+        )
+        polls = scheduler(self.poll)()
+        assert [next(polls) for _ in range(8)] == [1, 1, 1, 1, 1, 2, 3, 4]
+        # stable : grows up to max_period. changing : shortens down to ratelimit.
+        # note the scheduler waits two periods between calls.
+        assert self.gaps() == [2, 4, 8, 8, 8, 4, 2]
+
+    def test_per_call(self):
+        def poll(resource):
+            self.calls.append((resource, self.clock))
+            return resource
+
+        scheduler = callscheduler(
+            ratelimit=1,
+            max_period=4,
+            changed=operator.ne,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+        )
+        scheduled = scheduler(poll)
+        x, y = scheduled("x"), scheduled("y")
+        for _ in range(4):
+            next(x)
+            next(y)
+        # each call only compares with its own previous results, and backs off
+        for resource in "xy":
+            times = [t for r, t in self.calls if r == resource]
+            gaps = [b - a for a, b in zip(times, times[1:])]
+            assert gaps == sorted(gaps) and gaps[-1] > gaps[0], gaps
+
+        # resumed per arguments
+        state = scheduler.snapshot()
+        restored = callscheduler(
+            ratelimit=1,
+            max_period=4,
+            changed=operator.ne,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+        )
+        restored.restore(state)
+        assert restored.snapshot()["intervals"] == state["intervals"]
+        assert len(state["intervals"]) == 2
+
+    def test_snapshot(self):
+        self.results = [1, 1, 1]
+        scheduler = callscheduler(
+            ratelimit=1,
+            changed=operator.ne,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+        )
+        polls = scheduler(self.poll)()
+        for _ in range(3):
+            next(polls)
+        state = scheduler.snapshot()
+        assert [interval for key, interval in state["intervals"]] == [4]
+
+        self.results = [1, 1]
+        restored = callscheduler(
+            ratelimit=1,
+            changed=operator.ne,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+        )
+        restored.restore(state)
+        self.calls = []
+        polls = restored(self.poll)()
+        next(polls)
+        next(polls)
+        # resumes at the slow rate, not from ratelimit
+        assert self.gaps() == [8]
+
+    def test_stable_yields_exhausted_limit(self):
+        # one call every 10 seconds, shared with others, already used up
+        limit = CompositeLimit((1, 10))
+        limit.acquire(0)
+        self.results = [1, 1, 1]
+        scheduler = callscheduler(
+            ratelimit=1,
+            max_period=4,
+            changed=operator.ne,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+            limit=limit,
+        )
+        polls = scheduler(self.poll)()
+        assert next(polls) == 1
+        # nothing known about the value yet : waits for the limit
+        assert self.calls == [10]
+        # somebody else used the limit meanwhile
+        limit.acquire(self.clock)
+        assert next(polls) == 1
+        assert self.calls == [10, 30]
+        assert next(polls) == 1
+        # stable : skipped the call at 34 when the limit was exhausted, backing off to max_period instead
+        assert self.calls == [10, 30, 42]
+        assert self.slept[-2:] == [4, 8]
+
+    def test_changing_waits_for_limit(self):
+        limit = CompositeLimit((1, 10))
+        self.results = [1, 2, 3]
+        scheduler = callscheduler(
+            ratelimit=1,
+            changed=operator.ne,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+            limit=limit,
+        )
+        polls = scheduler(self.poll)()
+        assert [next(polls) for _ in range(3)] == [1, 2, 3]
+        # spends the whole budget
+        assert self.gaps() == [10, 10]
@@ -0,0 +1,129 @@
+import dataclasses
+import gc
+import unittest
+import weakref
+
+from ..calllimiter import calllimiter
+
+
+class TestBinding(unittest.TestCase):
+    def timer(self):
+        return self.clock
+
+    def sleepcounter(self, to_sleep):
+        self.slept.append(to_sleep)
+
+    def setUp(self) -> None:
+        self.clock = 0
+        self.slept = []
+
+    def client(self, binding):
+        limiter = calllimiter(
+            ratelimit=5, timer=self.timer, sleeper=self.sleepcounter, binding=binding
+        )
+
+        class Client:
+            @limiter
+            def fetch(self):
+                return 42
+
+        class OtherClient(Client):
+            pass
+
+        return limiter, Client, OtherClient
+
+    def test_function(self):
+        limiter, Client, _ = self.client("function")
+        self.clock = 5
+        Client().fetch()
+        Client().fetch()
+        # all instances share one limit
+        assert self.slept == [5]
+
+    def test_instance(self):
+        limiter, Client, _ = self.client("instance")
+        self.clock = 5
+        a, b = Client(), Client()
+        assert a.fetch() == 42
+        assert b.fetch() == 42
+        # each instance runs at full rate
+        assert self.slept == []
+        a.fetch()
+        assert self.slept == [5]
+
+    def test_instance_collected(self):
+        limiter, Client, _ = self.client("instance")
+        a = Client()
+        a.fetch()
+        ref = weakref.ref(a)
+        del a
+        gc.collect()
+        assert ref() is None
+
+    def test_unhashable_instances(self):
+        limiter = calllimiter(
+            ratelimit=5, timer=self.timer, sleeper=self.sleepcounter, binding="instance"
+        )
+
+        @dataclasses.dataclass
+        class Client:
+            account: str
+
+            @limiter
+            def fetch(self):
+                return self.account
+
+        self.clock = 5
+        assert Client("a").fetch() == "a"
+        # equal, but another client : its own limit
+        assert Client("a").fetch() == "a"
+        assert self.slept == []
+
+    def test_equal_instances(self):
+        limiter, Client, _ = self.client("instance")
+        Client.__eq__ = lambda self, other: True
+        Client.__hash__ = lambda self: 0
+        self.clock = 5
+        a, b = Client(), Client()
+        a.fetch()
+        b.fetch()
+        assert self.slept == []
+
+    def test_state_dropped_with_instance(self):
+        limiter, Client, _ = self.client("instance")
+        self.clock = 5
+        a = Client()
+        a.fetch()
+        del a
+        gc.collect()
+        # a new instance, maybe at the same address, starts fresh
+        Client().fetch()
+        assert self.slept == []
+
+    def test_class(self):
+        limiter, Client, OtherClient = self.client("class")
+        self.clock = 5
+        Client().fetch()
+        Client().fetch()
+        OtherClient().fetch()
+        # one limit for each class, shared by its instances
+        assert self.slept == [5]
+
+    def test_slots_without_weakref(self):
+        limiter = calllimiter(
+            ratelimit=5, timer=self.timer, sleeper=self.sleepcounter, binding="instance"
+        )
+
+        class Slotted:
+            __slots__ = ()
+
+            @limiter
+            def fetch(self):
+                return 42
+
+        with self.assertRaises(TypeError):
+            Slotted().fetch()
+
+    def test_unknown_binding(self):
+        with self.assertRaises(ValueError):
+            calllimiter(ratelimit=5, binding="module")
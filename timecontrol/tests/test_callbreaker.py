@@ -0,0 +1,177 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from ..callbreaker import CircuitBreaker, CircuitOpenError, callbreaker
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def timer(self):
+        return self.clock
+
+    def setUp(self) -> None:
+        self.clock = 0
+        self.breaker = CircuitBreaker(
+            window=10, buckets=5, min_calls=4, reset_timeout=5, timer=self.timer
+        )
+
+    def test_rolling_window(self):
+        self.breaker.record(0, failed=True)
+        self.breaker.record(0, failed=True)
+        self.clock = 3
+        self.breaker.record(3, failed=False)
+        assert self.breaker.stats()["calls"] == 3
+        assert self.breaker.stats()["failures"] == 2
+
+        # first bucket is now out of the window
+        self.clock = 11
+        assert self.breaker.stats()["calls"] == 1
+        assert self.breaker.stats()["failures"] == 0
+
+        # ring bucket reused, stale statistics dropped
+        self.breaker.record(11, failed=False)
+        assert self.breaker.stats()["calls"] == 2
+
+    def test_open_and_recover(self):
+        for _ in range(3):
+            self.breaker.record(0, failed=True)
+        # not enough calls yet
+        assert self.breaker.state == CircuitBreaker.CLOSED
+        self.breaker.record(0, failed=False)
+        assert self.breaker.state == CircuitBreaker.OPEN
+        assert not self.breaker.allow()
+
+        self.clock = 5
+        assert self.breaker.state == CircuitBreaker.HALF_OPEN
+        assert self.breaker.allow()
+        # only one probe
+        assert not self.breaker.allow()
+        self.breaker.record(5, failed=False)
+        assert self.breaker.state == CircuitBreaker.CLOSED
+        assert self.breaker.stats()["calls"] == 0
+
+    def test_probe_fails(self):
+        for _ in range(4):
+            self.breaker.record(0, failed=True)
+        self.clock = 6
+        assert self.breaker.allow()
+        self.breaker.record(6, failed=True)
+        assert self.breaker.state == CircuitBreaker.OPEN
+        self.clock = 10
+        assert self.breaker.state == CircuitBreaker.OPEN
+
+    def test_slow_calls(self):
+        breaker = CircuitBreaker(
+            window=10, buckets=5, min_calls=2, slow_call=2, timer=self.timer
+        )
+        self.clock = 3
+        breaker.record(0, failed=False)
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record(0, failed=False)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.stats()["mean_latency"] == 3
+
+    def test_slow_failures_counted_once(self):
+        breaker = CircuitBreaker(
+            window=10, buckets=5, min_calls=10, slow_call=2, timer=self.timer
+        )
+        self.clock = 3
+        for _ in range(3):
+            breaker.record(0, failed=True)
+        for _ in range(7):
+            breaker.record(3, failed=False)
+        # 3 bad calls out of 10, not 6
+        assert breaker.stats()["bad"] == 3
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_datetime_timer(self):
+        start = datetime(2020, 1, 1)
+        self.clock = start
+        breaker = CircuitBreaker(
+            window=60, min_calls=1, slow_call=timedelta(seconds=1), timer=self.timer
+        )
+        breaker.record(start, failed=True)
+        assert breaker.state == CircuitBreaker.OPEN
+        self.clock = start + timedelta(seconds=30)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+class TestCallBreaker(unittest.TestCase):
+    def timer(self):
+        return self.clock
+
+    def flaky(self):
+        self.attempts += 1
+        if self.failing:
+            raise ConnectionError("upstream unavailable")
+        return self.result
+
+    def setUp(self) -> None:
+        self.clock = 0
+        self.attempts = 0
+        self.failing = True
+        self.result = 42
+
+    def test_fail_fast(self):
+        breaker = callbreaker(min_calls=2, reset_timeout=5, timer=self.timer)
+        flaky = breaker(self.flaky)
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                flaky()
+        with self.assertRaises(CircuitOpenError):
+            flaky()
+        assert self.attempts == 2
+        assert breaker.breaker.state == CircuitBreaker.OPEN
+
+        self.clock = 5
+        self.failing = False
+        assert flaky() == 42
+        assert breaker.breaker.state == CircuitBreaker.CLOSED
+
+    def test_default_timer(self):
+        flaky = callbreaker()(self.flaky)
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                flaky()
+        assert self.attempts == 3
+
+
+class TestASyncCallBreaker(unittest.IsolatedAsyncioTestCase):
+    def timer(self):
+        return self.clock
+
+    async def flaky_coro(self):
+        self.attempts += 1
+        raise ConnectionError("upstream unavailable")
+
+    def setUp(self) -> None:
+        self.clock = 0
+        self.attempts = 0
+
+    async def test_fail_fast_coro(self):
+        breaker = callbreaker(min_calls=1, timer=self.timer)
+        flaky = breaker(self.flaky_coro)
+        with self.assertRaises(ConnectionError):
+            await flaky()
+        with self.assertRaises(CircuitOpenError):
+            await flaky()
+        assert self.attempts == 1
+
+    async def test_cancelled_probe(self):
+        breaker = callbreaker(min_calls=1, reset_timeout=5, timer=self.timer)
+        flaky = breaker(self.flaky_coro)
+        with self.assertRaises(ConnectionError):
+            await flaky()
+
+        async def hanging():
+            await asyncio.sleep(10)
+
+        probe = breaker(hanging)
+        self.clock = 5
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(probe(), 0.01)
+        # the probe slot is free again
+        assert breaker.breaker.state == CircuitBreaker.HALF_OPEN
+        with self.assertRaises(ConnectionError):
+            await flaky()
+        assert self.attempts == 2
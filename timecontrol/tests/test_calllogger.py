@@ -0,0 +1,93 @@
+import asyncio
+import tracemalloc
+import unittest
+
+from ..calllogger import calllogger
+from ..metrics import REGISTRY, QuantileSketch, metric_name
+
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_relative_accuracy(self):
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for v in range(1, 1001):
+            sketch.observe(v / 1000)
+        for q in (0.5, 0.9, 0.99):
+            expected = (q * 999 + 1) / 1000
+            assert abs(sketch.quantile(q) - expected) <= 0.011 * expected
+
+    def test_bounded(self):
+        sketch = QuantileSketch(max_buckets=10)
+        for v in range(1, 1000):
+            sketch.observe(v)
+        assert len(sketch.buckets) <= 10
+        assert sketch.count == 999
+        # high quantiles are kept
+        assert abs(sketch.quantile(1) - 999) <= 0.011 * 999
+
+    def test_zeros(self):
+        sketch = QuantileSketch()
+        sketch.observe(0)
+        sketch.observe(0)
+        sketch.observe(1)
+        assert sketch.quantile(0.5) == 0
+        assert abs(sketch.quantile(1) - 1) < 0.011
+
+
+class TestProfiler(unittest.TestCase):
+    def sampler(self):
+        # every other call is sampled
+        self.draws += 1
+        return 0.0 if self.draws % 2 else 0.99
+
+    def work(self, size):
+        return [0] * size
+
+    def setUp(self) -> None:
+        self.draws = 0
+
+    def test_sampled(self):
+        profiled = calllogger(
+            profile=True, sample_rate=0.5, name="test_sampled", random=self.sampler
+        )(self.work)
+        for _ in range(10):
+            assert profiled(10) == [0] * 10
+
+        prof = REGISTRY.profile("test_sampled")
+        assert prof.calls == 10
+        assert prof.sampled == 5
+        stats = prof.collect()
+        assert stats["wall_mean"] > 0
+        assert stats["wall_quantiles"][0.5] > 0
+        assert stats["alloc_mean"] == 0
+
+    def test_default_name(self):
+        profiled = calllogger(profile=True)(self.work)
+        profiled(1)
+        assert REGISTRY.profile(metric_name(self.work)).calls == 1
+
+    def test_allocations(self):
+        was_tracing = tracemalloc.is_tracing()
+        try:
+            profiled = calllogger(
+                profile=True, trace_allocations=True, name="test_allocations"
+            )(self.work)
+            kept = profiled(100_000)
+            assert REGISTRY.profile("test_allocations").alloc_sum >= 100_000 * 8
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+
+class TestASyncProfiler(unittest.IsolatedAsyncioTestCase):
+    async def test_profiled_coro(self):
+        async def work():
+            await asyncio.sleep(0.01)
+            return 42
+
+        profiled = calllogger(profile=True, name="test_profiled_coro")(work)
+        assert await profiled() == 42
+        prof = REGISTRY.profile("test_profiled_coro")
+        assert prof.sampled == 1
+        assert prof.wall_sum >= 0.01
+        # sleeping does not use cpu
+        assert prof.cpu_sum < prof.wall_sum
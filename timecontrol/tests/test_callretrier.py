@@ -0,0 +1,173 @@
+import unittest
+
+from ..callretrier import RetryBudget, callretrier
+from ..compositelimiter import CompositeLimit, compositelimiter
+
+
+class TestRetryBudget(unittest.TestCase):
+    def test_fraction_of_calls(self):
+        budget = RetryBudget(ratio=0.5, cap=1)
+        assert budget.withdraw()
+        assert not budget.withdraw()
+        budget.deposit()
+        assert not budget.withdraw()
+        budget.deposit()
+        assert budget.withdraw()
+
+
+class TestCallRetrier(unittest.TestCase):
+    def timer(self):
+        return self.clock
+
+    def sleepcounter(self, to_sleep):
+        self.sleeps.append(to_sleep)
+
+    def jitter(self, low, high):
+        # deterministic : upper bound of the range
+        return high
+
+    def flaky(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("upstream unavailable")
+        return self.result
+
+    def setUp(self) -> None:
+        self.clock = 0
+        self.sleeps = []
+        self.attempts = 0
+        self.failures = 0
+        self.result = 42
+
+    def test_no_failure(self):
+        retrier = callretrier(sleeper=self.sleepcounter, jitter=self.jitter)
+        assert retrier(self.flaky)() == 42
+        assert self.attempts == 1
+        assert self.sleeps == []
+
+    def test_backoff(self):
+        self.failures = 3
+        retrier = callretrier(
+            retries=3, base=1, cap=5, sleeper=self.sleepcounter, jitter=self.jitter
+        )
+        assert retrier(self.flaky)() == 42
+        assert self.attempts == 4
+        assert self.sleeps == [3, 5, 5]
+
+    def test_gives_up(self):
+        self.failures = 10
+        retrier = callretrier(retries=2, sleeper=self.sleepcounter, jitter=self.jitter)
+        with self.assertRaises(ConnectionError):
+            retrier(self.flaky)()
+        assert self.attempts == 3
+
+    def test_not_retried(self):
+        self.failures = 10
+        retrier = callretrier(
+            retry_on=(TimeoutError,), sleeper=self.sleepcounter, jitter=self.jitter
+        )
+        with self.assertRaises(ConnectionError):
+            retrier(self.flaky)()
+        assert self.attempts == 1
+
+    def test_budget_exhausted(self):
+        self.failures = 100
+        retrier = callretrier(
+            retries=5,
+            budget=RetryBudget(ratio=0.1, cap=2),
+            sleeper=self.sleepcounter,
+            jitter=self.jitter,
+        )
+        flaky = retrier(self.flaky)
+        with self.assertRaises(ConnectionError):
+            flaky()
+        # 2 retries from the budget cap only
+        assert self.attempts == 3
+        with self.assertRaises(ConnectionError):
+            flaky()
+        # no retry left in budget
+        assert self.attempts == 4
+
+    def test_retries_consume_limit(self):
+        self.failures = 1
+        limit = CompositeLimit((1, 10))
+        retrier = callretrier(
+            base=1,
+            limit=limit,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+            jitter=self.jitter,
+        )
+        assert retrier(self.flaky)() == 42
+        # one combined sleep : the limit is slower than the backoff
+        assert self.sleeps == [10]
+        assert limit.windows[0].tokens == -1
+
+    def test_stacked_on_compositelimiter(self):
+        def sleeper(to_sleep):
+            self.sleeps.append(to_sleep)
+            self.clock += to_sleep
+
+        self.failures = 1
+        limiter = compositelimiter((1, 10), timer=self.timer, sleeper=sleeper)
+        retrier = callretrier(
+            base=1,
+            limit=limiter.limit,
+            timer=self.timer,
+            sleeper=sleeper,
+            jitter=self.jitter,
+        )
+        assert retrier(limiter(self.flaky))() == 42
+        # one combined sleep, in the retrier : the limiter does not need to wait anymore
+        assert self.sleeps == [10]
+        # each attempt consumed the limit once
+        assert limiter.limit.windows[0].tokens == 0
+
+    def test_stacked_on_keyed_compositelimiter(self):
+        self.failures = 1
+        shared = CompositeLimit((10, 10))
+        limiter = compositelimiter(
+            (5, 10),
+            parent=shared,
+            key=lambda: "account",
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+        )
+        assert limiter.limit is shared
+        retrier = callretrier(
+            base=1,
+            limit=limiter.limit,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+            jitter=self.jitter,
+        )
+        assert retrier(limiter(self.flaky))() == 42
+        # both attempts consumed the shared limit, once each
+        assert shared.windows[0].tokens == 8
+        assert limiter.limits["account"].windows[0].tokens == 3
+
+
+class TestASyncCallRetrier(unittest.IsolatedAsyncioTestCase):
+    async def sleepcounter(self, to_sleep):
+        self.sleeps.append(to_sleep)
+
+    def jitter(self, low, high):
+        return low
+
+    async def flaky_coro(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("upstream unavailable")
+        return self.result
+
+    def setUp(self) -> None:
+        self.sleeps = []
+        self.attempts = 0
+        self.failures = 2
+        self.result = 42
+
+    async def test_backoff_coro(self):
+        retrier = callretrier(base=0.5, sleeper=self.sleepcounter, jitter=self.jitter)
+        assert await retrier(self.flaky_coro)() == 42
+        assert self.attempts == 3
+        assert self.sleeps == [0.5, 0.5]
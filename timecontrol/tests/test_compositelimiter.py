@@ -0,0 +1,149 @@
+import unittest
+from datetime import datetime, timedelta
+
+from ..compositelimiter import CompositeLimit, compositelimiter
+
+
+class TestCompositeLimit(unittest.TestCase):
+    def test_full_on_creation(self):
+        limit = CompositeLimit((2, 1), (3, 10))
+        assert limit.reserve(0) == 0
+        assert limit.reserve(0) == 0
+
+    def test_combined_wait(self):
+        limit = CompositeLimit((2, 1), (3, 10))
+        limit.reserve(0)
+        limit.reserve(0)
+        # per-second window empty : 0.5s, per-10s window still has one call
+        assert limit.reserve(0) == 0.5
+        # both windows are now in debt, the slowest one decides
+        assert abs(limit.reserve(0.5) - 0.85 / 0.3) < 1e-9
+        # nothing consumed by peeking
+        assert limit.delay(0.5) == limit.delay(0.5)
+
+    def test_parent_shared(self):
+        parent = CompositeLimit((3, 1))
+        child_a = CompositeLimit((2, 1), parent=parent)
+        child_b = CompositeLimit((2, 1), parent=parent)
+
+        assert child_a.reserve(0) == 0
+        assert child_a.reserve(0) == 0
+        # child_b has its own quota, but shares the parent one
+        assert child_b.reserve(0) == 0
+        assert child_b.reserve(0) == 1 / 3
+        assert parent.windows[0].tokens == -1
+
+    def test_datetime_and_mixed_periods(self):
+        limit = CompositeLimit((1, 2), (10, timedelta(minutes=1)))
+        start = datetime(2020, 1, 1)
+        assert limit.reserve(start) == 0
+        assert limit.reserve(start + timedelta(seconds=1)) == 1
+
+    def test_default_timer(self):
+        slept = []
+        limited = compositelimiter((10, 1), (600, 60), sleeper=slept.append)(lambda: 42)
+        for _ in range(11):
+            assert limited() == 42
+        assert len(slept) == 1 and 0 < slept[0] <= 0.1
+
+
+class TestCompositeLimiter(unittest.TestCase):
+    def timer(self):
+        return self.clock
+
+    def sleepcounter(self, to_sleep):
+        self.slept += to_sleep
+
+    def limited(self, account):
+        self.calls.append(account)
+        return self.result
+
+    def setUp(self) -> None:
+        self.clock = 0
+        self.slept = 0
+        self.result = 42
+        self.calls = []
+
+    def test_one_sleep_for_all_windows(self):
+        limiter = compositelimiter(
+            (1, 1), (2, 10), timer=self.timer, sleeper=self.sleepcounter
+        )
+        limited = limiter(self.limited)
+
+        assert limited("a") == 42
+        assert self.slept == 0
+        limited("a")
+        assert self.slept == 1
+        self.clock += 1
+        self.slept = 0
+        limited("a")
+        # only one sleep, for the longest window (1 call debt at 0.2 call/s)
+        assert abs(self.slept - 4) < 1e-9
+        assert self.calls == ["a", "a", "a"]
+
+    def test_per_key_with_global(self):
+        shared = CompositeLimit((3, 1))
+        limiter = compositelimiter(
+            (1, 1),
+            parent=shared,
+            key=lambda account: account,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+        )
+        limited = limiter(self.limited)
+
+        limited("a")
+        limited("b")
+        limited("c")
+        assert self.slept == 0
+        assert set(limiter.limits) == {"a", "b", "c"}
+
+        # global quota exhausted, even for a new key
+        limited("d")
+        assert self.slept == 1 / 3
+
+    def test_idle_keys_pruned(self):
+        limiter = compositelimiter(
+            (1, 10),
+            key=lambda account: account,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+        )
+        limited = limiter(self.limited)
+        for account in range(1000):
+            limited(account)
+            self.clock += 1
+        # only keys used within the last period are kept, amortized
+        assert len(limiter.limits) <= 128
+        state = limiter.snapshot()
+        # back to full after 10s : a new limit would be the same
+        assert len(state["keys"]) == 9
+        assert 999 in limiter.limits
+
+
+class TestASyncCompositeLimiter(unittest.IsolatedAsyncioTestCase):
+    def timer(self):
+        return self.clock
+
+    async def sleepcounter(self, to_sleep):
+        self.slept += to_sleep
+
+    async def limited_coro(self):
+        return self.result
+
+    def setUp(self) -> None:
+        self.clock = 0
+        self.slept = 0
+        self.result = 42
+
+    async def test_reserve_before_sleep(self):
+        limiter = compositelimiter((1, 2), timer=self.timer, sleeper=self.sleepcounter)
+        limited = limiter(self.limited_coro)
+
+        assert await limited() == 42
+        assert self.slept == 0
+        await limited()
+        assert self.slept == 2
+        # clock did not move : the third call is queued after the second one
+        await limited()
+        assert self.slept == 2 + 4
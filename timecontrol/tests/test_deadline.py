@@ -0,0 +1,142 @@
+import asyncio
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from ..calllimiter import calllimiter
+from ..callretrier import callretrier
+from ..compositelimiter import compositelimiter
+from ..deadline import DeadlineExceeded, deadline, remaining
+
+
+class TestDeadline(unittest.TestCase):
+    def timer(self):
+        return self.clock
+
+    def sleepcounter(self, to_sleep):
+        self.slept = to_sleep
+
+    def limited(self):
+        self.limited_call = True
+        return self.result
+
+    def setUp(self) -> None:
+        self.clock = 0
+        self.slept = 0
+        self.result = 42
+        self.limited_call = False
+
+    def test_remaining(self):
+        assert remaining() is None
+        with deadline(5, timer=self.timer):
+            assert remaining() == 5
+            self.clock = 2
+            assert remaining() == 3
+            # inner deadline cannot extend the outer one
+            with deadline(10, timer=self.timer):
+                assert remaining() == 3
+            with deadline(1, timer=self.timer):
+                assert remaining() == 1
+            assert remaining() == 3
+        assert remaining() is None
+
+    def test_timedelta_and_datetime(self):
+        with deadline(timedelta(seconds=2)):
+            assert 1.9 < remaining() <= 2
+        with deadline(2, timer=datetime.now):
+            assert 1.9 < remaining() <= 2
+        with deadline(timedelta(seconds=2), timer=datetime.now):
+            assert 1.9 < remaining() <= 2
+
+    def test_limiter_fails_fast(self):
+        limited = calllimiter(ratelimit=5, timer=self.timer, sleeper=self.sleepcounter)(
+            self.limited
+        )
+        self.clock = 1
+        with deadline(3, timer=self.timer):
+            with self.assertRaises(DeadlineExceeded):
+                limited()
+        assert self.slept == 0
+        assert self.limited_call == False
+
+        with deadline(4, timer=self.timer):
+            assert limited() == 42
+        assert self.slept == 4
+
+    def test_compositelimiter_keeps_quota(self):
+        limiter = compositelimiter((1, 10), timer=self.timer, sleeper=self.sleepcounter)
+        limited = limiter(self.limited)
+        limited()
+        with deadline(5, timer=self.timer):
+            with self.assertRaises(DeadlineExceeded):
+                limited()
+        # the failed call did not consume anything
+        assert limiter.limit.windows[0].tokens == 0
+
+    def test_retrier_stops_at_deadline(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(self.clock)
+            raise ConnectionError("upstream unavailable")
+
+        def sleeper(to_sleep):
+            self.clock += to_sleep
+
+        retried = callretrier(
+            retries=5, base=2, sleeper=sleeper, jitter=lambda low, high: low
+        )(flaky)
+        with deadline(5, timer=self.timer):
+            with self.assertRaises(ConnectionError):
+                retried()
+        # third retry would happen after the deadline
+        assert attempts == [0, 2, 4]
+
+
+class TestASyncDeadline(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_at_deadline(self):
+        @calllimiter(ratelimit=0.01, timer=time.monotonic)
+        async def slow():
+            await asyncio.sleep(10)
+
+        with deadline(0.05):
+            with self.assertRaises(DeadlineExceeded):
+                await slow()
+
+    async def test_within_deadline(self):
+        @calllimiter(ratelimit=0.01, timer=time.monotonic)
+        async def fast():
+            return 42
+
+        with deadline(1):
+            assert await fast() == 42
+
+    async def test_callee_timeout_retried(self):
+        attempts = []
+
+        async def sleeper(to_sleep):
+            pass
+
+        @callretrier(retries=3, retry_on=(TimeoutError,), sleeper=sleeper)
+        async def upstream():
+            attempts.append(1)
+            raise TimeoutError("upstream timed out")
+
+        with deadline(10):
+            # the callee's own timeout, not the deadline
+            with self.assertRaises(TimeoutError) as raised:
+                await upstream()
+        assert not isinstance(raised.exception, DeadlineExceeded)
+        assert len(attempts) == 4
+
+    async def test_outer_cancel(self):
+        @calllimiter(ratelimit=0.01, timer=time.monotonic)
+        async def slow():
+            await asyncio.sleep(10)
+
+        with deadline(10):
+            task = asyncio.ensure_future(slow())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
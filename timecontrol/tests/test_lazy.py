@@ -0,0 +1,77 @@
+import asyncio
+import os
+import subprocess
+import sys
+import unittest
+
+import timecontrol
+
+from .._wrap import ASYNC, SYNC, callable_kind
+from ..calllimiter import calllimiter
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_fresh_import(self):
+        code = (
+            "import sys, timecontrol\n"
+            "timecontrol.calllimiter(ratelimit=1)(lambda: None)\n"
+            "print(sorted(m for m in sys.modules if m.split('.')[0] in ('timecontrol', 'wrapt', 'structlog')))\n"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.dirname(timecontrol.__file__)),
+        ).stdout
+        # neither structlog nor wrapt is needed to limit a plain function
+        assert "wrapt" not in out and "structlog" not in out, out
+
+    def test_names_not_shadowed_by_submodules(self):
+        from ..deadline import deadline
+
+        # the deadline module is already imported, still the package exports the function
+        assert timecontrol.deadline is deadline
+        assert timecontrol.calllimiter is calllimiter
+        assert "StateFile" in dir(timecontrol)
+        with self.assertRaises(AttributeError):
+            timecontrol.missing
+
+
+class TestFastPath(unittest.TestCase):
+    def test_callable_kind(self):
+        async def coro():
+            pass
+
+        assert callable_kind(coro) == ASYNC
+        assert callable_kind(self.test_callable_kind) == SYNC
+        assert callable_kind(lambda: None) == SYNC
+        assert callable_kind(len) is None
+
+    def test_metadata(self):
+        def answer(x):
+            """the answer"""
+            return x
+
+        limited = calllimiter(ratelimit=None)(answer)
+        assert limited.__name__ == "answer"
+        assert limited.__doc__ == "the answer"
+        assert limited.__wrapped__ is answer
+        assert limited(42) == 42
+
+    def test_method(self):
+        class Client:
+            @calllimiter(ratelimit=None)
+            def fetch(self, x):
+                return self, x
+
+        c = Client()
+        assert c.fetch(42) == (c, 42)
+
+    def test_coroutine(self):
+        async def answer():
+            return 42
+
+        limited = calllimiter(ratelimit=None)(answer)
+        assert asyncio.iscoroutinefunction(limited)
+        assert asyncio.run(limited()) == 42
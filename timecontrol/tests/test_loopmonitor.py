@@ -0,0 +1,129 @@
+import asyncio
+import time
+import unittest
+
+from ..calllimiter import calllimiter
+from ..callscheduler import callscheduler
+from ..loopmonitor import LoadFeedback, LoopMonitor
+
+
+class TestLoadFeedback(unittest.TestCase):
+    def setUp(self) -> None:
+        self.monitor = LoopMonitor(smoothing=1.0)
+        self.feedback = LoadFeedback(
+            self.monitor, overloaded=0.05, idle=0.005, min_factor=0.5, max_factor=4
+        )
+
+    def test_backoff_and_speedup(self):
+        assert self.feedback.factor == 1
+        self.monitor.sample(0.1)
+        assert self.feedback.factor == 2
+        self.monitor.sample(0.1)
+        self.monitor.sample(0.1)
+        assert self.feedback.factor == 4
+        # in between : no change
+        self.monitor.sample(0.01)
+        assert self.feedback.factor == 4
+        for _ in range(5):
+            self.monitor.sample(0)
+        assert self.feedback.factor == 0.5
+        assert self.feedback.scale(10) == 5
+        assert self.monitor.max_lag == 0.1
+
+
+class TestFeedbackSubscribers(unittest.TestCase):
+    def timer(self):
+        return self.clock
+
+    def sleepcounter(self, to_sleep):
+        self.slept = to_sleep
+        self.clock += to_sleep
+
+    def work(self):
+        return 42
+
+    def setUp(self) -> None:
+        self.clock = 0
+        self.slept = 0
+        self.monitor = LoopMonitor(smoothing=1.0)
+        self.feedback = LoadFeedback(self.monitor, min_factor=0.5)
+
+    def test_scheduler_backs_off(self):
+        self.monitor.sample(1)
+        assert self.feedback.factor == 2
+        scheduled = callscheduler(
+            ratelimit=5,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+            feedback=self.feedback,
+        )(self.work)
+        self.clock = 3
+        next(scheduled())
+        # period is 10 now : 10 - ((3 - -5) - 10)
+        assert self.slept == 12
+
+    def test_limiter_never_speeds_up(self):
+        self.monitor.sample(0)
+        assert self.feedback.factor == 0.5
+        limited = calllimiter(
+            ratelimit=5,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+            feedback=self.feedback,
+        )(self.work)
+        self.clock = 3
+        limited()
+        assert self.slept == 2
+
+
+class TestLoopMonitor(unittest.IsolatedAsyncioTestCase):
+    async def test_lag_and_slow_callbacks(self):
+        def blocking():
+            time.sleep(0.05)
+
+        async def blocking_coro():
+            time.sleep(0.05)
+
+        monitor = LoopMonitor(interval=0.01, slow_callback=0.04, track_callbacks=True)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.02)
+            asyncio.get_running_loop().call_soon(blocking)
+            await asyncio.create_task(blocking_coro())
+            await asyncio.sleep(0.03)
+        finally:
+            monitor.stop()
+
+        assert monitor.samples > 0
+        assert monitor.max_lag >= 0.03
+        origins = [o for o, d in monitor.slow_callbacks]
+        assert any("blocking" in o for o in origins)
+        assert any(o.startswith("blocking_coro (") for o in origins)
+        # patch removed
+        assert asyncio.Handle._run.__name__ == "_run"
+        assert asyncio.Handle._run.__qualname__ == "Handle._run"
+
+    async def test_overlapping_monitors(self):
+        original = asyncio.Handle._run
+
+        def blocking():
+            time.sleep(0.05)
+
+        a = LoopMonitor(interval=0.01, slow_callback=0.04, track_callbacks=True)
+        b = LoopMonitor(interval=0.01, slow_callback=0.04, track_callbacks=True)
+        a.start()
+        b.start()
+        try:
+            asyncio.get_running_loop().call_soon(blocking)
+            await asyncio.sleep(0.02)
+            a.stop()
+            # b still tracks, a does not anymore
+            asyncio.get_running_loop().call_soon(blocking)
+            await asyncio.sleep(0.02)
+        finally:
+            a.stop()
+            b.stop()
+
+        assert len([o for o, d in a.slow_callbacks if "blocking" in o]) == 1
+        assert len([o for o, d in b.slow_callbacks if "blocking" in o]) == 2
+        assert asyncio.Handle._run is original
@@ -0,0 +1,145 @@
+import asyncio
+import unittest
+
+from ..calllimiter import calllimiter
+from ..callscheduler import callscheduler
+from ..compositelimiter import compositelimiter
+from ..deadline import DeadlineExceeded, deadline
+from ..metrics import REGISTRY, Histogram, Registry, metric_name
+
+
+class TestHistogram(unittest.TestCase):
+    def test_buckets(self):
+        h = Histogram((1, 5))
+        for v in (0, 1, 2, 10):
+            h.observe(v)
+        assert h.counts == [2, 1, 1]
+        assert h.sum == 13
+        assert h.count == 4
+
+
+class TestRegistry(unittest.TestCase):
+    def test_prometheus(self):
+        registry = Registry()
+        m = registry.limiter('api "v1"')
+        m.admitted.inc(3)
+        m.wait.observe(0.002)
+        s = registry.scheduler("poll")
+        s.lateness.observe(100)
+
+        text = registry.prometheus()
+        assert "# TYPE timecontrol_limiter_admitted_total counter" in text
+        assert 'timecontrol_limiter_admitted_total{limiter="api \\"v1\\""} 3' in text
+        assert (
+            'timecontrol_limiter_wait_seconds_bucket{limiter="api \\"v1\\"",le="0.005"} 1'
+            in text
+        )
+        assert (
+            'timecontrol_scheduler_lateness_seconds_bucket{scheduler="poll",le="60.0"} 0'
+            in text
+        )
+        assert (
+            'timecontrol_scheduler_lateness_seconds_bucket{scheduler="poll",le="+Inf"} 1'
+            in text
+        )
+
+        assert registry.collect()["limiters"]['api "v1"']["admitted"] == 3
+
+
+class TestLimiterMetrics(unittest.TestCase):
+    def timer(self):
+        return self.clock
+
+    def sleepcounter(self, to_sleep):
+        self.clock += to_sleep
+
+    def limited(self):
+        return 42
+
+    def setUp(self) -> None:
+        self.clock = 0
+
+    def test_calllimiter(self):
+        limited = calllimiter(
+            ratelimit=5,
+            timer=self.timer,
+            sleeper=self.sleepcounter,
+            name="test_calllimiter",
+        )(self.limited)
+        metrics = REGISTRY.limiter("test_calllimiter")
+
+        limited()
+        limited()
+        with deadline(1, timer=self.timer):
+            with self.assertRaises(DeadlineExceeded):
+                limited()
+
+        assert metrics.admitted.value == 2
+        assert metrics.rejected.value == 1
+        assert metrics.waiting.value == 0
+        assert metrics.wait.count == 2
+        assert metrics.wait.sum == 10
+
+    def test_compositelimiter_default_name(self):
+        limiter = compositelimiter((1, 2), timer=self.timer, sleeper=self.sleepcounter)
+        limiter(self.limited)()
+        limiter(self.limited)()
+        metrics = REGISTRY.limiter(metric_name(self.limited))
+        assert metrics.admitted.value == 2
+        assert metrics.wait.sum == 2
+        # qualified with the module, so same-named functions are not merged
+        assert metric_name(self.limited) == f"{__name__}.TestLimiterMetrics.limited"
+
+    def test_callscheduler(self):
+        def late_sleeper(to_sleep):
+            self.clock += to_sleep + 1
+
+        scheduled = callscheduler(
+            ratelimit=5, timer=self.timer, sleeper=late_sleeper, name="test_scheduler"
+        )(self.limited)
+        metrics = REGISTRY.scheduler("test_scheduler")
+        self.clock = 3
+        next(scheduled())
+        assert metrics.ticks.value == 1
+        assert metrics.lateness.count == 1
+        assert metrics.lateness.sum == 1
+
+
+class TestASyncLimiterMetrics(unittest.IsolatedAsyncioTestCase):
+    async def test_queue_depth(self):
+        release = asyncio.Event()
+
+        async def sleeper(to_sleep):
+            await release.wait()
+
+        limited = calllimiter(
+            ratelimit=5, sleeper=sleeper, timer=lambda: 0, name="test_queue"
+        )(self.limited_coro)
+        metrics = REGISTRY.limiter("test_queue")
+        tasks = [asyncio.create_task(limited()) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert metrics.waiting.value == 3
+        release.set()
+        await asyncio.gather(*tasks)
+        assert metrics.waiting.value == 0
+        assert metrics.admitted.value == 3
+
+    async def limited_coro(self):
+        return 42
+
+    async def test_exporter(self):
+        REGISTRY.limiter("test_exporter").admitted.inc()
+        server = await REGISTRY.serve(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /metrics HTTP/1.0\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+        assert response.startswith(b"HTTP/1.0 200 OK")
+        assert (
+            b'timecontrol_limiter_admitted_total{limiter="test_exporter"} 1' in response
+        )
@@ -0,0 +1,197 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from ..calllimiter import calllimiter
+from ..callretrier import RetryBudget
+from ..compositelimiter import CompositeLimit, compositelimiter
+from ..persistence import StateFile, decode, encode
+
+
+class TestEncoding(unittest.TestCase):
+    def test_roundtrip(self):
+        for value in [
+            42,
+            4.2,
+            None,
+            "key",
+            datetime(2020, 1, 14, 16, 55, 59),
+            timedelta(seconds=1.5),
+            ("account", 42),
+        ]:
+            assert decode(encode(value)) == value
+
+
+class TestStateFile(unittest.TestCase):
+    def timer(self):
+        return self.clock
+
+    def sleepcounter(self, to_sleep):
+        self.slept = to_sleep
+
+    def limited(self, account=None):
+        return self.result
+
+    def setUp(self) -> None:
+        self.clock = 0
+        self.slept = 0
+        self.result = 42
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "limiters.json")
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_no_file(self):
+        state = StateFile(self.path)
+        assert not state.load()
+
+    def test_corrupted_file(self):
+        with open(self.path, "w") as f:
+            f.write('{"version": 1, "sta')
+        state = StateFile(self.path)
+        assert not state.load()
+
+    def test_calllimiter_warm_restart(self):
+        state = StateFile(self.path)
+        limiter = state.register(
+            "limiter",
+            calllimiter(ratelimit=5, timer=self.timer, sleeper=self.sleepcounter),
+        )
+        self.clock = 10
+        limiter(self.limited)()
+        state.save()
+        # only the state file is left in the directory
+        assert os.listdir(self.tmpdir.name) == ["limiters.json"]
+
+        # "restart"
+        self.clock = 12
+        restarted = StateFile(self.path)
+        limiter = restarted.register(
+            "limiter",
+            calllimiter(ratelimit=5, timer=self.timer, sleeper=self.sleepcounter),
+        )
+        assert restarted.load()
+        limiter(self.limited)()
+        # waiting for the last call before restart, not for the creation
+        assert self.slept == 3
+
+    def test_compositelimiter_warm_restart(self):
+        shared = CompositeLimit((10, 60))
+        state = StateFile(self.path)
+        state.register("shared", shared)
+        limiter = state.register(
+            "limiter",
+            compositelimiter(
+                (1, 1),
+                parent=shared,
+                key=lambda account: account,
+                timer=self.timer,
+                sleeper=self.sleepcounter,
+            ),
+        )
+        state.register("budget", RetryBudget(cap=5))
+        limited = limiter(self.limited)
+        limited(("a", 1))
+        limited("b")
+        state.save()
+
+        restarted = StateFile(self.path)
+        shared = restarted.register("shared", CompositeLimit((10, 60)))
+        limiter = restarted.register(
+            "limiter",
+            compositelimiter(
+                (1, 1),
+                parent=shared,
+                key=lambda account: account,
+                timer=self.timer,
+                sleeper=self.sleepcounter,
+            ),
+        )
+        budget = restarted.register("budget", RetryBudget(cap=5))
+        budget.tokens = 0
+        assert restarted.load()
+
+        assert shared.windows[0].tokens == 8
+        assert set(limiter.limits) == {("a", 1), "b"}
+        assert limiter.limits["b"].windows[0].tokens == 0
+        assert budget.tokens == 5
+
+    def test_incompatible_state(self):
+        state = StateFile(self.path)
+        state.register("budget", RetryBudget(cap=5))
+        state.register("limiter", calllimiter(ratelimit=5, timer=datetime.now))
+        state.save()
+
+        # after a deploy, the limiter uses another timer
+        restarted = StateFile(self.path)
+        budget = restarted.register("budget", RetryBudget(cap=5))
+        budget.tokens = 1
+        limiter = restarted.register(
+            "limiter", calllimiter(ratelimit=5, timer=self.timer)
+        )
+        assert not restarted.load()
+        # the budget restored before the failure was put back
+        assert budget.tokens == 1
+        assert limiter.snapshot() == {"last": 0}
+
+    def test_windows_changed(self):
+        state = StateFile(self.path)
+        state.register("limit", CompositeLimit((1, 1)))
+        state.save()
+
+        restarted = StateFile(self.path)
+        limit = restarted.register("limit", CompositeLimit((1, 1), (10, 60)))
+        assert not restarted.load()
+        assert [w.tokens for w in limit.windows] == [1, 10]
+
+    def test_future_last_clamped(self):
+        # saved with a clock far ahead of the one we restart with
+        self.clock = 1000
+        limiter = calllimiter(ratelimit=5, timer=self.timer, sleeper=self.sleepcounter)
+        limiter(self.limited)()
+        composite = compositelimiter(
+            (1, 1), timer=self.timer, sleeper=self.sleepcounter
+        )
+        composite(self.limited)()
+        states = limiter.snapshot(), composite.snapshot()
+
+        self.clock = 10
+        limiter = calllimiter(ratelimit=5, timer=self.timer, sleeper=self.sleepcounter)
+        limiter.restore(states[0])
+        limiter(self.limited)()
+        # at most one period, not the 990s skew
+        assert self.slept == 5
+
+        self.slept = 0
+        composite = compositelimiter(
+            (1, 1), timer=self.timer, sleeper=self.sleepcounter
+        )
+        composite.restore(states[1])
+        composite(self.limited)()
+        assert self.slept == 1
+
+    def test_maybe_save(self):
+        state = StateFile(self.path, interval=5, timer=self.timer)
+        state.register("budget", RetryBudget())
+        assert state.maybe_save()
+        self.clock = 3
+        assert not state.maybe_save()
+        self.clock = 5
+        assert state.maybe_save()
+
+
+class TestAutoSave(unittest.IsolatedAsyncioTestCase):
+    async def test_saves_on_cancel(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "limiters.json")
+            state = StateFile(path, interval=10)
+            state.register("budget", RetryBudget())
+            task = asyncio.create_task(state.autosave())
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            assert StateFile(path).load()